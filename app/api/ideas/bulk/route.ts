@@ -0,0 +1,95 @@
+import { NextRequest, NextResponse } from "next/server";
+import { z } from "zod";
+import { getAnonId, getClientIp } from "@/lib/identity";
+import { auth } from "@/auth";
+import { detectMergeTarget } from "@/lib/idea-dedup";
+import { buildDedupInput, checkRateLimit, submitIdea } from "@/lib/idea-submission";
+
+const MAX_BULK_IDEAS = 25;
+// Ideas submitted at once per request: spec generation is slow, but each call also hits the LLM
+// and the database, so the fan-out stays bounded.
+const BULK_CONCURRENCY = 4;
+
+const bulkSchema = z.object({
+  ideas: z.array(z.unknown()).min(1).max(MAX_BULK_IDEAS),
+});
+
+// Groups the batch into chains of items that detectMergeTarget would merge with one another, each in
+// request order. Each submission only sees ideas that are already stored, so two similar items running
+// at the same time could both be created. Running a chain one item after another lets later items
+// merge, as they would if posted one at a time.
+function chainSimilarIdeas(ideas: unknown[]): number[][] {
+  const texts = ideas.map((idea) => buildDedupInput(idea));
+  const root = ideas.map((_, idx) => idx);
+  const find = (idx: number): number => (root[idx] === idx ? idx : (root[idx] = find(root[idx])));
+
+  for (let later = 1; later < ideas.length; later++) {
+    const text = texts[later];
+    if (text === null) continue;
+    for (let earlier = 0; earlier < later; earlier++) {
+      const candidate = texts[earlier];
+      if (candidate === null || find(earlier) === find(later)) continue;
+      if (detectMergeTarget(text, [{ id: String(earlier), text: candidate }])) {
+        root[find(later)] = find(earlier);
+      }
+    }
+  }
+
+  const chains = new Map<number, number[]>();
+  ideas.forEach((_, idx) => {
+    const chain = chains.get(find(idx)) ?? [];
+    chain.push(idx);
+    chains.set(find(idx), chain);
+  });
+  return Array.from(chains.values());
+}
+
+// Submits several ideas in one round trip. Chains of similar ideas run in order, and up to
+// BULK_CONCURRENCY unrelated chains run at once. Each item gets the status and body POST /api/ideas
+// would return, in request order.
+export async function POST(request: NextRequest) {
+  const anonId = await getAnonId();
+  const ipAddress = await getClientIp();
+  const session = await auth();
+  const userId = session?.user?.id ?? null;
+
+  const rateKey = anonId || (userId ? `user:${userId}` : "");
+  if (!rateKey) {
+    return NextResponse.json({ error: "Missing identity" }, { status: 400 });
+  }
+
+  const parsed = bulkSchema.safeParse(await request.json());
+  if (!parsed.success) {
+    return NextResponse.json({ error: parsed.error.flatten() }, { status: 400 });
+  }
+
+  const submitter = {
+    anonId: anonId || null,
+    userId,
+    fallbackName: session?.user?.name || session?.user?.email || null,
+  };
+
+  const ideas = parsed.data.ideas;
+  // Every item counts against the same hourly limit as a single submission. The counter is
+  // read-then-incremented, so the checks run one after another before any submission starts.
+  const allowed: boolean[] = [];
+  for (let i = 0; i < ideas.length; i++) {
+    allowed.push(await checkRateLimit(rateKey, ipAddress));
+  }
+
+  const results: Array<{ status: number; body: Record<string, unknown> }> = new Array(ideas.length);
+  const chains = chainSimilarIdeas(ideas);
+  let next = 0;
+  const worker = async () => {
+    while (next < chains.length) {
+      for (const idx of chains[next++]) {
+        results[idx] = allowed[idx]
+          ? await submitIdea(ideas[idx], submitter)
+          : { status: 429, body: { error: "Rate limit exceeded. Try again later." } };
+      }
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(BULK_CONCURRENCY, chains.length) }, worker));
+
+  return NextResponse.json({ results }, { status: 200 });
+}
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import synthetic_posts
+from src.web_user_summary.artifacts import load_clusters, parquet, write_compact_clusters, zstandard
+from src.web_user_summary.llm_requirement_filter import CLUSTER_FIELDS
+from src.web_user_summary.reporting import write_json
+
+# A consumer that skips the nested examples, which make up most of each row. Both the LLM filter and
+# the poster fallback read examples, so this is the case where Parquet can read only a few columns.
+SUMMARY_FIELDS = ("cluster_id", "summary_demand", "demand_count")
+
+
+def synthetic_clusters(count: int) -> List[Dict]:
+    posts = synthetic_posts(count * 3)
+    clusters = []
+    for idx in range(count):
+        members = posts[idx * 3 : idx * 3 + 3]
+        clusters.append(
+            {
+                "cluster_id": f"demand_{idx + 1:03d}",
+                "summary_demand": members[0].title,
+                "normalized_anchor": " ".join(sorted(set(members[0].title.lower().split()))),
+                "demand_count": len(members),
+                "urgency_avg": 0.5,
+                "confidence_avg": 3.0,
+                "keywords": members[0].title.lower().split()[:8],
+                "subreddits": sorted({p.subreddit for p in members}),
+                "examples": [
+                    {
+                        "post_id": p.id,
+                        "subreddit": p.subreddit,
+                        "title": p.title,
+                        "demand_text": p.selftext[:400],
+                        "permalink": p.permalink,
+                        "confidence_score": 3,
+                    }
+                    for p in members
+                ],
+            }
+        )
+    return clusters
+
+
+def seconds(fn: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Disk size and load time of plain vs compact cluster artifacts.")
+    parser.add_argument("--clusters", type=int, default=20_000)
+    args = parser.parse_args()
+
+    clusters = synthetic_clusters(args.clusters)
+    meta = {"total_clusters": len(clusters)}
+    results: Dict[str, Dict] = {
+        "clusters": {"count": len(clusters)},
+        # Compact output depends on the extras in requirements-social-extras.txt.
+        "extras": {"zstandard": zstandard is not None, "pyarrow": parquet is not None},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_dir, compact_dir = Path(tmp) / "json", Path(tmp) / "compact"
+        plain_dir.mkdir()
+        compact_dir.mkdir()
+        write_json(plain_dir / "demand_clusters.json", {"meta": meta, "clusters": clusters})
+        written = write_compact_clusters(compact_dir, meta, clusters)
+        for name, run_dir in (("json", plain_dir), ("compact", compact_dir)):
+            results[name] = {
+                "bytes": sum(p.stat().st_size for p in run_dir.iterdir()),
+                "load_all_s": round(seconds(lambda: load_clusters(run_dir)), 3),
+                "load_llm_fields_s": round(seconds(lambda: load_clusters(run_dir, fields=CLUSTER_FIELDS)), 3),
+                "load_summary_fields_s": round(seconds(lambda: load_clusters(run_dir, fields=SUMMARY_FIELDS)), 3),
+            }
+        results["compact"]["files"] = {p.name: p.stat().st_size for p in written}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
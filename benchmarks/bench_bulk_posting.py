@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+POSTER = ROOT / "scripts" / "post_requirements_to_demandsolution.py"
+# Mirrors BULK_CONCURRENCY in app/api/ideas/bulk/route.ts.
+BULK_CONCURRENCY = 4
+
+
+class StubIdeasServer(ThreadingHTTPServer):
+    # Fixed round-trip latency per request plus server-side work per idea. Without bulk support the
+    # bulk endpoint answers missing_status, as a site predating it would (404, or 405 behind some proxies).
+    def __init__(self, rtt_s: float, item_s: float, bulk: bool, missing_status: int = 404) -> None:
+        super().__init__(("127.0.0.1", 0), StubIdeasHandler)
+        self.rtt_s = rtt_s
+        self.item_s = item_s
+        self.bulk = bulk
+        self.missing_status = missing_status
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.ideas = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def next_idea_id(self) -> str:
+        with self.lock:
+            self.ideas += 1
+            return f"idea-{self.ideas}"
+
+
+class StubIdeasHandler(BaseHTTPRequestHandler):
+    server: StubIdeasServer
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, payload: Dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self._send(200, {"ok": True})
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            self._handle_post(body)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def _handle_post(self, body: Dict) -> None:
+        time.sleep(self.server.rtt_s)
+        if self.path == "/api/ideas/bulk":
+            if not self.server.bulk:
+                return self._send(self.server.missing_status, {"error": "not found"})
+            ideas = body.get("ideas", [])
+            time.sleep(self.server.item_s * math.ceil(len(ideas) / BULK_CONCURRENCY))
+            results = [{"status": 201, "body": {"idea": {"id": self.server.next_idea_id()}}} for _ in ideas]
+            return self._send(200, {"results": results})
+        time.sleep(self.server.item_s)
+        self._send(201, {"idea": {"id": self.server.next_idea_id()}})
+
+
+def write_accepted(run_dir: Path, count: int) -> None:
+    accepted = [
+        {
+            "cluster_id": f"bench_{idx}",
+            "requirement": f"Benchmark requirement number {idx} for a small workflow tool",
+            "demand_count": 1,
+            "examples": [],
+        }
+        for idx in range(count)
+    ]
+    (run_dir / "llm_requirement_accepted.json").write_text(json.dumps({"accepted": accepted}), encoding="utf-8")
+
+
+def run_poster(server: StubIdeasServer, run_dir: Path, flags: List[str]) -> Dict:
+    server.requests = 0
+    server.max_in_flight = 0
+    state_name = f"state_{time.monotonic_ns()}"
+    cmd = [
+        sys.executable,
+        str(POSTER),
+        "--site-url",
+        f"http://127.0.0.1:{server.server_address[1]}",
+        "--input-dir",
+        str(run_dir),
+        "--state-log",
+        str(run_dir / f"{state_name}.jsonl"),
+        "--state-file",
+        str(run_dir / f"{state_name}.sqlite3"),
+        "--legacy-state-file",
+        str(run_dir / "missing.json"),
+        "--near-dup-threshold",
+        "0",
+        "--no-warm-up",
+        *flags,
+    ]
+    started = time.perf_counter()
+    subprocess.run(cmd, check=True, capture_output=True)
+    elapsed = time.perf_counter() - started
+    results = json.loads((run_dir / "posted_to_demandsolution.json").read_text(encoding="utf-8"))["results"]
+    return {
+        "seconds": round(elapsed, 2),
+        "requests": server.requests,
+        "max_in_flight": server.max_in_flight,
+        "posted": sum(1 for r in results if r["status"] == "posted"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Round trips and wall time of single vs bulk idea posting.")
+    parser.add_argument("--ideas", type=int, default=12)
+    parser.add_argument("--rtt-ms", type=float, default=150.0)
+    # Server-side spec generation calls an LLM, which takes seconds per idea.
+    parser.add_argument("--item-ms", type=float, default=3000.0)
+    args = parser.parse_args()
+
+    scenarios = {
+        "single_workers_1": (True, ["--bulk-size", "0", "--workers", "1"]),
+        "single_workers_4": (True, ["--bulk-size", "0", "--workers", "4"]),
+        "bulk_20_workers_4": (True, ["--bulk-size", "20", "--workers", "4"]),
+        "bulk_fallback_workers_4": (False, ["--bulk-size", "20", "--workers", "4"]),
+    }
+    results: Dict[str, Dict] = {"ideas": args.ideas, "rtt_ms": args.rtt_ms, "item_ms": args.item_ms}
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp)
+        write_accepted(run_dir, args.ideas)
+        for name, (bulk, flags) in scenarios.items():
+            server = StubIdeasServer(args.rtt_ms / 1000.0, args.item_ms / 1000.0, bulk)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                results[name] = run_poster(server, run_dir, flags)
+            finally:
+                server.shutdown()
+                server.server_close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+from benchmarks.corpus import synthetic_normalized_texts
+from src.web_user_summary.demand_extractor import cluster_demands
+from src.web_user_summary.models import DemandCandidate
+
+
+def synthetic_candidates(count: int) -> List[DemandCandidate]:
+    texts = synthetic_normalized_texts(count)
+    return [
+        DemandCandidate(
+            post_id=str(idx),
+            subreddit="hackernews",
+            created_utc=0.0,
+            title=text,
+            demand_text=text,
+            normalized_text=text,
+            confidence_score=idx % 5,
+            urgency_score=0,
+            keyword_tokens=text.split()[:8],
+            permalink="",
+            url="",
+        )
+        for idx, text in enumerate(texts)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cluster_demands engines.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated candidate counts.")
+    parser.add_argument("--scan-max", type=int, default=5000, help="Largest size also run through the O(n*k) scan.")
+    parser.add_argument("--threshold", type=float, default=0.62)
+    parser.add_argument(
+        "--tfidf-threshold",
+        type=float,
+        default=0.45,
+        help="Cosine threshold for the tfidf engine; 0.45 gives about as many clusters as 0.62 on this corpus.",
+    )
+    parser.add_argument("--no-tfidf", action="store_true", help="Skip the numpy/scipy engine.")
+    args = parser.parse_args()
+
+    for size in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        candidates = synthetic_candidates(size)
+        started = time.perf_counter()
+        indexed = cluster_demands(candidates, threshold=args.threshold, engine="index")
+        index_s = time.perf_counter() - started
+        line = f"n={size:>7}  index={index_s:8.2f}s  clusters={len(indexed)}"
+        if not args.no_tfidf:
+            started = time.perf_counter()
+            vectors = cluster_demands(candidates, threshold=args.tfidf_threshold, engine="tfidf")
+            tfidf_s = time.perf_counter() - started
+            line += f"  tfidf={tfidf_s:8.2f}s  vs_index={index_s / max(tfidf_s, 1e-9):6.1f}x  tfidf_clusters={len(vectors)}"
+        if size <= args.scan_max:
+            started = time.perf_counter()
+            scanned = cluster_demands(candidates, threshold=args.threshold, engine="scan")
+            scan_s = time.perf_counter() - started
+            scanned_keys = {(c.normalized_anchor, c.demand_count) for c in scanned}
+            agree = sum(1 for c in indexed if (c.normalized_anchor, c.demand_count) in scanned_keys)
+            line += (
+                f"  scan={scan_s:8.2f}s  speedup={scan_s / max(index_s, 1e-9):6.1f}x"
+                f"  identical_clusters={agree}/{len(scanned)}"
+            )
+        print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
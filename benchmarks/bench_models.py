@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, fields, make_dataclass
+from typing import Callable, Dict, Iterable
+
+from benchmarks.corpus import synthetic_posts
+from src.web_user_summary.models import RedditPost
+from src.web_user_summary.post_batch import PostBatch
+
+# The pre-slots model: a plain dataclass with a per-instance __dict__, serialized via asdict().
+DictPost = make_dataclass("DictPost", [(f.name, f.type) for f in fields(RedditPost)])
+
+
+def measure_bytes(build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return after - before
+
+
+def rows_per_second(rows: Callable[[], Iterable[Dict]], count: int, encode: bool) -> float:
+    started = time.perf_counter()
+    for row in rows():
+        if encode:
+            json.dumps(row, ensure_ascii=False)
+    return count / max(time.perf_counter() - started, 1e-9)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory and serialization cost of post representations.")
+    parser.add_argument("--posts", type=int, default=100_000)
+    args = parser.parse_args()
+
+    posts = synthetic_posts(args.posts)
+    values = [[getattr(p, f.name) for f in fields(RedditPost)] for p in posts]
+    scale = 100_000 / len(posts)
+
+    dict_posts = [DictPost(*v) for v in values]
+    slotted = [RedditPost(*v) for v in values]
+    batch = PostBatch.from_posts(slotted)
+
+    # Object overhead only: the string payloads are shared by all three and excluded here.
+    results = {
+        "posts": len(posts),
+        "mb_per_100k": {
+            "dataclass": measure_bytes(lambda: [DictPost(*v) for v in values]) * scale / 2**20,
+            "slotted": measure_bytes(lambda: [RedditPost(*v) for v in values]) * scale / 2**20,
+            "post_batch": measure_bytes(lambda: PostBatch.from_posts(slotted)) * scale / 2**20,
+        },
+    }
+    serializers = {
+        "asdict": lambda: (asdict(p) for p in dict_posts),
+        "to_dict": lambda: (p.to_dict() for p in slotted),
+        "post_batch": batch.iter_dicts,
+    }
+    for encode in (False, True):
+        label = "jsonl_rows_per_s" if encode else "dict_rows_per_s"
+        results[label] = {name: rows_per_second(rows, len(posts), encode) for name, rows in serializers.items()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
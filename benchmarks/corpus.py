@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import random
+import time
+from typing import Iterator, List
+
+from src.web_user_summary.models import RedditPost
+from src.web_user_summary.post_batch import PostBatch
+
+_OPENERS = [
+    "I need",
+    "I wish there was",
+    "Looking for",
+    "Does anyone know",
+    "Is there any",
+    "How do I",
+    "Struggling with",
+    "We built",
+    "Launching",
+    "Any recommendation for",
+    "Frustrated by",
+    "Rate my",
+]
+_OBJECTS = [
+    "an app to track invoices",
+    "a tool that syncs calendars across teams",
+    "software for scheduling shifts",
+    "a way to automate weekly reports",
+    "a dashboard for server costs",
+    "a browser extension that blocks meetings",
+    "an integration between Slack and Jira",
+    "a workflow for onboarding contractors",
+    "a plugin to export notes",
+    "automation for expense approvals",
+    "a platform to share recipes",
+]
+_FILLER = (
+    "the team keeps losing time on this every week and nothing we tried works well "
+    "our current process is manual spreadsheets emails and reminders that nobody reads "
+    "deadline is close and we are blocked right now so it is urgent "
+    "see https://example.com/thread for context "
+    "it would help small businesses freelancers and students"
+).split()
+
+
+def synthetic_post(rng: random.Random, idx: int, now: float) -> RedditPost:
+    opener = rng.choice(_OPENERS)
+    obj = rng.choice(_OBJECTS)
+    title = f"{opener} {obj}{rng.choice(['?', '', '.', '!'])}"
+    body_words = [rng.choice(_FILLER) for _ in range(rng.randint(10, 160))]
+    sentences = []
+    for start in range(0, len(body_words), 14):
+        chunk = " ".join(body_words[start : start + 14])
+        sentences.append(chunk[:1].upper() + chunk[1:] + rng.choice([".", "?", "!"]))
+    if rng.random() < 0.5:
+        sentences.insert(rng.randint(0, len(sentences)), f"{rng.choice(_OPENERS)} {rng.choice(_OBJECTS)}.")
+    source = rng.choice(["hackernews", "stackexchange:stackoverflow", "stackexchange:superuser"])
+    post_id = str(100000 + idx)
+    # Shaped like SocialClient output for each source.
+    if source == "hackernews":
+        permalink = f"https://news.ycombinator.com/item?id={post_id}"
+        url = f"https://example.com/{idx}"
+        sort_source = f"hn:{opener.lower()}"
+    else:
+        site = source.split(":", 1)[1]
+        permalink = url = f"https://{site}.com/questions/{post_id}"
+        sort_source = f"se:{site}:{opener.lower()}"
+    return RedditPost(
+        id=post_id,
+        subreddit=source,
+        title=title,
+        selftext=" ".join(sentences),
+        author=f"user{rng.randint(1, 5000)}",
+        created_utc=now - rng.uniform(0, 7 * 24 * 3600),
+        score=rng.randint(0, 300),
+        num_comments=rng.randint(0, 80),
+        upvote_ratio=0.0,
+        permalink=permalink,
+        url=url,
+        sort_source=sort_source,
+    )
+
+
+def iter_synthetic_posts(count: int, seed: int = 7) -> Iterator[RedditPost]:
+    rng = random.Random(seed)
+    now = time.time()
+    for idx in range(count):
+        yield synthetic_post(rng, idx, now)
+
+
+def synthetic_posts(count: int, seed: int = 7) -> List[RedditPost]:
+    return list(iter_synthetic_posts(count, seed))
+
+
+def synthetic_batch(count: int, seed: int = 7) -> PostBatch:
+    # Same rows as synthetic_posts without holding a RedditPost per row, for the 1M-post corpora.
+    return PostBatch.from_posts(iter_synthetic_posts(count, seed))
+
+
+_INFLECTIONS = ("", "s", "ing", "ed", "er")
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    consonants = "bcdfghjklmnprstvwz"
+    vowels = "aeiou"
+    words = set()
+    while len(words) < size:
+        length = rng.randint(2, 4)
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    return sorted(words)
+
+
+def synthetic_normalized_texts(count: int, themes: int = 0, seed: int = 11) -> List[str]:
+    # Token sets shaped like `_normalize_phrase` output: a theme's core words plus noise, with
+    # dropped words and inflection changes so clustering sees near-duplicates and paraphrases.
+    rng = random.Random(seed)
+    # Heaps' law: vocabulary grows roughly with the square root of the token count.
+    vocab = _vocabulary(rng, max(2000, int(40 * (8 * count) ** 0.5)))
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    themes = themes or max(10, count // 8)
+    theme_words = [rng.sample(vocab, rng.randint(4, 8)) for _ in range(themes)]
+    out: List[str] = []
+    for _ in range(count):
+        words = [w for w in rng.choice(theme_words) if rng.random() > 0.2]
+        words = [w + rng.choice(_INFLECTIONS) if rng.random() < 0.25 else w for w in words]
+        words.extend(rng.choices(vocab, weights=weights, k=rng.randint(0, 4)))
+        out.append(" ".join(sorted(set(words))[:24]))
+    return out
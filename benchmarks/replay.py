@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from benchmarks.corpus import synthetic_post
+from src.web_user_summary.fetch_engine import FetchEngine, FetchJob
+from src.web_user_summary.rate_limit import HostRateLimiter
+from src.web_user_summary.social_client import HN_SEARCH_URL, SE_SEARCH_URL, SocialClient, stackexchange_question_url
+
+# Moving time-window filters; ignored when matching a request to its fixture so recordings replay on later days.
+VOLATILE_PARAMS = frozenset({"numericFilters", "fromdate"})
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+DEFAULT_QUERIES = "need app,looking for tool,wish there was,how do i automate"
+USER_AGENT = "demand-signal-collector/bench"
+
+
+def fixture_key(url: str) -> str:
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS)
+    blob = json.dumps([parts.netloc, parts.path, params], separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def write_fixture(out_dir: Path, url: str, status: int, headers: Dict[str, str], body: Dict) -> Path:
+    path = out_dir / f"{fixture_key(url)}.json"
+    record = {"url": url, "status": status, "headers": headers, "body": body}
+    path.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+class ReplayAdapter(BaseAdapter):
+    # Serves recorded responses from a fixture directory; unknown requests get a 404.
+    def __init__(self, fixtures_dir: Path) -> None:
+        super().__init__()
+        self.records: Dict[str, Tuple[int, Dict[str, str], bytes]] = {}
+        for path in fixtures_dir.glob("*.json"):
+            record = json.loads(path.read_text(encoding="utf-8"))
+            body = json.dumps(record["body"], ensure_ascii=False).encode("utf-8")
+            self.records[path.stem] = (int(record["status"]), record.get("headers", {}), body)
+        self.served = 0
+        self.missing: List[str] = []
+        self._lock = threading.Lock()
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        record = self.records.get(fixture_key(request.url))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.encoding = "utf-8"
+        with self._lock:
+            if record is None:
+                self.missing.append(request.url)
+            else:
+                self.served += 1
+        if record is None:
+            response.status_code = 404
+            response._content = b"{}"
+            return response
+        response.status_code, headers, response._content = record
+        response.headers = CaseInsensitiveDict(headers)
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    # Live HTTP that also saves every successful response as a fixture.
+    def __init__(self, out_dir: Path) -> None:
+        super().__init__()
+        self.out_dir = out_dir
+        self.recorded = 0
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            headers = {k: response.headers[k] for k in KEPT_HEADERS if k in response.headers}
+            write_fixture(self.out_dir, request.url, response.status_code, headers, response.json())
+            self.recorded += 1
+        return response
+
+
+def replay_client(fixtures_dir: Path) -> Tuple[SocialClient, ReplayAdapter]:
+    # No throttling and a single attempt: replay measures client-side cost, not API politeness.
+    unthrottled = {urlsplit(url).netloc: (1e6, 1e6) for url in (HN_SEARCH_URL, SE_SEARCH_URL)}
+    client = SocialClient(user_agent=USER_AGENT, max_retries=1, rate_limiter=HostRateLimiter(unthrottled))
+    adapter = ReplayAdapter(fixtures_dir)
+    client.session.mount("https://", adapter)
+    return client, adapter
+
+
+def fetch_jobs(queries: Sequence[str], site: str) -> List[FetchJob]:
+    jobs: List[FetchJob] = []
+    for query in queries:
+        jobs.append(FetchJob(source="hackernews", query=query))
+        jobs.append(FetchJob(source="stackoverflow", query=query, site=site))
+    return jobs
+
+
+def _prepared_url(url: str, params: Dict) -> str:
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+def synthesize_fixtures(
+    out_dir: Path, queries: Sequence[str], per_query: int, site: str = "stackoverflow", seed: int = 7
+) -> int:
+    # API-shaped pages built from the synthetic corpus, with the exact request params SocialClient sends,
+    # so replay works without any recorded traffic.
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    now = time.time()
+    page_size = min(100, max(1, per_query))
+    pages = math.ceil(max(1, per_query) / page_size)
+    written = 0
+    idx = 0
+    for query in queries:
+        for page in range(pages):
+            hits = []
+            for _ in range(page_size):
+                post = synthetic_post(rng, idx, now)
+                idx += 1
+                hits.append(
+                    {
+                        "objectID": post.id,
+                        "title": post.title,
+                        "story_text": post.selftext,
+                        "author": post.author,
+                        "created_at_i": int(post.created_utc),
+                        "points": post.score,
+                        "num_comments": post.num_comments,
+                        "url": post.url,
+                    }
+                )
+            params = {"query": query, "tags": "story", "hitsPerPage": page_size, "page": page}
+            write_fixture(out_dir, _prepared_url(HN_SEARCH_URL, params), 200, {}, {"hits": hits, "nbPages": pages})
+            written += 1
+        for page in range(1, pages + 1):
+            items = []
+            for _ in range(page_size):
+                post = synthetic_post(rng, idx, now)
+                idx += 1
+                items.append(
+                    {
+                        "question_id": int(post.id),
+                        "title": post.title,
+                        "body": f"<p>{post.selftext}</p>",
+                        "owner": {"display_name": post.author},
+                        "creation_date": int(post.created_utc),
+                        "link": stackexchange_question_url(site, post.id),
+                        "score": post.score,
+                        "answer_count": post.num_comments,
+                    }
+                )
+            params = {
+                "order": "desc",
+                "sort": "creation",
+                "site": site,
+                "q": query,
+                "pagesize": page_size,
+                "page": page,
+                "filter": "withbody",
+            }
+            body = {"items": items, "has_more": page < pages, "quota_remaining": 9000}
+            write_fixture(out_dir, _prepared_url(SE_SEARCH_URL, params), 200, {}, body)
+            written += 1
+    return written
+
+
+def replay_fetch(fixtures_dir: Path, queries: Sequence[str], per_query: int, site: str, workers: int = 4) -> Dict:
+    client, adapter = replay_client(fixtures_dir)
+    engine = FetchEngine(client, workers=workers, per_host_limit=workers)
+    started = time.perf_counter()
+    results = engine.run(fetch_jobs(queries, site), limit=per_query)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": elapsed,
+        "responses": adapter.served,
+        "missing_fixtures": len(adapter.missing),
+        "posts": sum(len(r.posts) for r in results),
+        "failed_jobs": sum(1 for r in results if r.error is not None),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or synthesize API fixtures for offline replay benchmarks.")
+    parser.add_argument("mode", choices=["record", "synthesize"], help="record: live APIs; synthesize: offline pages.")
+    parser.add_argument("--out", required=True, help="Fixture directory.")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES)
+    parser.add_argument("--per-query", type=int, default=100)
+    parser.add_argument("--site", default="stackoverflow")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    queries = [q.strip() for q in args.queries.split(",") if q.strip()]
+    if args.mode == "synthesize":
+        print(f"Wrote {synthesize_fixtures(out_dir, queries, args.per_query, site=args.site)} fixtures to {out_dir}")
+        return
+    client = SocialClient(user_agent=USER_AGENT)
+    adapter = RecordingAdapter(out_dir)
+    client.session.mount("https://", adapter)
+    results = FetchEngine(client).run(fetch_jobs(queries, args.site), limit=args.per_query)
+    failed = [r.job.label for r in results if r.error is not None]
+    print(f"Recorded {adapter.recorded} responses to {out_dir}")
+    if failed:
+        print(f"Failed jobs: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, TypeVar
+
+from benchmarks.corpus import synthetic_batch
+from benchmarks.replay import DEFAULT_QUERIES, replay_fetch, synthesize_fixtures
+from src.web_user_summary.demand_extractor import cluster_demands, extract_demand_candidates
+from src.web_user_summary.llm_requirement_filter import normalize_result
+from src.web_user_summary.reporting import serialize_candidates, serialize_clusters, write_json, write_jsonl
+from src.web_user_summary.run_metrics import peak_rss_mb
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+T = TypeVar("T")
+# Stages faster than this are timer noise at best-of-3 and are listed but never flagged.
+MIN_FLAG_SECONDS = 0.01
+# The exact scan is quadratic, so it only runs as a reference stage on small candidate sets.
+SCAN_MAX_CANDIDATES = 5000
+# Cosine threshold giving about as many clusters as 0.62 does for the other engines (see bench_clustering).
+TFIDF_THRESHOLD = 0.45
+
+
+def timed(fn: Callable[[], T], repeat: int) -> Tuple[float, T]:
+    # Best of `repeat` runs; the last result is returned for follow-up stages.
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def synthetic_llm_results(count: int) -> List[Dict]:
+    # The loose shapes normalize_result has to cope with: bool/str/int accept flags, string confidences.
+    accepts = [True, "yes", 0, "false"]
+    return [
+        {
+            "cluster_id": f"demand_{idx:03d}",
+            "accept": accepts[idx % len(accepts)],
+            "normalized_requirement": f"  Requirement number {idx} for a workflow tool  ",
+            "reason": "Concrete need with a buildable software solution.",
+            "confidence": "0.8" if idx % 2 else 0.65,
+        }
+        for idx in range(count)
+    ]
+
+
+def bench_size(size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    posts = synthetic_batch(size)
+    out: Dict[str, float] = {}
+    out["extract_demand_candidates"], candidates = timed(
+        lambda: extract_demand_candidates(posts, max_age_hours=168, min_score=2), repeat
+    )
+    # What the CLI runs by default; other engines are extra stages labelled with their name.
+    out["cluster_demands"], clusters = timed(lambda: cluster_demands(candidates, threshold=0.62), repeat)
+    if len(candidates) <= SCAN_MAX_CANDIDATES:
+        out["cluster_demands.scan"], _ = timed(
+            lambda: cluster_demands(candidates, threshold=0.62, engine="scan"), repeat
+        )
+    try:
+        out["cluster_demands.tfidf"], _ = timed(
+            lambda: cluster_demands(candidates, threshold=TFIDF_THRESHOLD, engine="tfidf"), repeat
+        )
+    except RuntimeError as exc:
+        print(f"Skipping cluster_demands.tfidf: {exc}", flush=True)
+    out["write.raw_posts"], _ = timed(lambda: write_jsonl(work_dir / "raw_posts.jsonl", posts.iter_dicts()), repeat)
+    out["write.demand_candidates"], _ = timed(
+        lambda: write_jsonl(work_dir / "demand_candidates.jsonl", serialize_candidates(candidates)), repeat
+    )
+    out["write.demand_clusters"], _ = timed(
+        lambda: write_json(work_dir / "demand_clusters.json", {"meta": {}, "clusters": serialize_clusters(clusters)}),
+        repeat,
+    )
+    llm_results = synthetic_llm_results(size)
+    out["normalize_result"], _ = timed(lambda: [normalize_result(r) for r in llm_results], repeat)
+    out["candidates"] = len(candidates)
+    out["clusters"] = len(clusters)
+    return out
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short=12", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    # One line per timed metric present in both runs; ratios above 1 + tolerance are flagged.
+    lines: List[str] = []
+    sections = [("replay", current.get("replay", {}), baseline.get("replay", {}))]
+    for size, metrics in current.get("sizes", {}).items():
+        sections.append((f"n={size}", metrics, baseline.get("sizes", {}).get(size, {})))
+    for label, now, before in sections:
+        for name, value in now.items():
+            old = before.get(name)
+            if name not in before or not isinstance(value, float) or not old:
+                continue
+            ratio = value / old
+            flag = "  REGRESSION" if ratio > 1.0 + tolerance and max(old, value) >= MIN_FLAG_SECONDS else ""
+            lines.append(f"{label:>10} {name:<26} {old:9.4f}s -> {value:9.4f}s  x{ratio:5.2f}{flag}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks on synthetic and replayed corpora.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated post counts (e.g. add 1000000).")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of runs per timed stage.")
+    parser.add_argument(
+        "--fixtures",
+        default="",
+        help="Recorded API fixtures (see benchmarks.replay); synthesized into a temp dir when omitted.",
+    )
+    parser.add_argument("--queries", default=DEFAULT_QUERIES)
+    parser.add_argument("--per-query", type=int, default=300, help="Posts per query and source in the replay.")
+    parser.add_argument("--site", default="stackoverflow")
+    parser.add_argument("--out", default="", help="Result JSON path (default: benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", default="", help="Earlier result JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown ratio above 1 that counts as a regression.")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    queries = [q.strip() for q in args.queries.split(",") if q.strip()]
+    results: Dict = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        fixtures_dir = Path(args.fixtures) if args.fixtures else work_dir / "fixtures"
+        if not args.fixtures:
+            synthesize_fixtures(fixtures_dir, queries, args.per_query, site=args.site)
+        results["replay"] = replay_fetch(fixtures_dir, queries, args.per_query, args.site)
+        results["replay"]["source"] = str(fixtures_dir) if args.fixtures else "synthesized"
+        print(f"replay: {json.dumps(results['replay'])}", flush=True)
+        for size in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            results["sizes"][str(size)] = bench_size(size, args.repeat, work_dir)
+            print(f"n={size}: {json.dumps(results['sizes'][str(size)])}", flush=True)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    out_path = Path(args.out) if args.out else RESULTS_DIR / f"{commit or 'worktree'}.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Saved results to {out_path}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"Compared with {args.compare} (commit {baseline.get('commit', '?')}):")
+        for line in compare(results, baseline, args.tolerance):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
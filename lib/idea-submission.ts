@@ -0,0 +1,280 @@
+import { z } from "zod";
+import { prisma } from "@/lib/prisma";
+import { generateSpec } from "@/lib/llm";
+import { mapIdea, mapTask, parseJsonArray } from "@/lib/db-mappers";
+import { findBlockedContent } from "@/lib/content-moderation";
+import { detectMergeTarget } from "@/lib/idea-dedup";
+import { cleanProblemStatement, stripSocialRequirementPrefix } from "@/lib/idea-copy";
+import { buildMeaningfulTitle } from "@/lib/title";
+
+export const createIdeaSchema = z.object({
+  raw_input_text: z.string().min(20).max(3000),
+  target_users: z.string().max(300).optional(),
+  platform: z.enum(["Web", "Mobile", "Desktop", "Any"]).optional(),
+  constraints: z.string().max(500).optional(),
+  source_tag: z.string().max(40).optional(),
+  show_name: z.boolean().optional().default(false),
+});
+
+const RATE_LIMIT_PER_HOUR = 20;
+
+export type IdeaSubmitter = {
+  anonId: string | null;
+  userId: string | null;
+  fallbackName: string | null;
+};
+
+export type SubmissionOutcome = {
+  status: number;
+  body: Record<string, unknown>;
+};
+
+function normalizeSourceTag(sourceTag?: string): string | null {
+  const rawTag = sourceTag?.trim();
+  if (!rawTag) return null;
+  return rawTag.replace(/\s+/g, "_").slice(0, 40);
+}
+
+function mergeIdeaTags(primaryTags: string[], extraTags: string[]): string[] {
+  const seen = new Set<string>();
+  const merged: string[] = [];
+
+  for (const rawTag of [...primaryTags, ...extraTags]) {
+    const tag = rawTag.trim();
+    if (!tag) continue;
+    const key = tag.toLowerCase();
+    if (seen.has(key)) continue;
+    seen.add(key);
+    merged.push(tag);
+  }
+
+  return merged;
+}
+
+export async function checkRateLimit(rateKey: string, ipAddress: string): Promise<boolean> {
+  const now = new Date();
+  const windowStart = `${now.getUTCFullYear()}-${now.getUTCMonth() + 1}-${now.getUTCDate()}-${now.getUTCHours()}`;
+
+  const existing = await prisma.submissionRateLimit.findUnique({
+    where: {
+      anonId_ipAddress_windowStart: { anonId: rateKey, ipAddress, windowStart },
+    },
+  });
+
+  if (!existing) {
+    await prisma.submissionRateLimit.create({
+      data: { anonId: rateKey, ipAddress, windowStart, count: 1 },
+    });
+    return true;
+  }
+
+  if (existing.count >= RATE_LIMIT_PER_HOUR) {
+    return false;
+  }
+
+  await prisma.submissionRateLimit.update({
+    where: { id: existing.id },
+    data: { count: { increment: 1 } },
+  });
+
+  return true;
+}
+
+async function applyMergeSupportVote(ideaId: string, userId: string | null, anonId: string | null) {
+  if (userId) {
+    const existing = await prisma.ideaUserVote.findUnique({ where: { ideaId_userId: { ideaId, userId } } });
+    if (existing) return;
+
+    await prisma.ideaUserVote.create({ data: { ideaId, userId } });
+    await prisma.idea.update({ where: { id: ideaId }, data: { upvotesCount: { increment: 1 } } });
+    return;
+  }
+
+  if (anonId) {
+    const existing = await prisma.vote.findUnique({ where: { ideaId_anonId: { ideaId, anonId } } });
+    if (existing) return;
+
+    await prisma.vote.create({ data: { ideaId, anonId } });
+    await prisma.idea.update({ where: { id: ideaId }, data: { upvotesCount: { increment: 1 } } });
+  }
+}
+
+// The text a submission is compared on when looking for an existing idea to merge into.
+function dedupInputFor(data: z.infer<typeof createIdeaSchema>): string {
+  return [stripSocialRequirementPrefix(data.raw_input_text), data.target_users, data.platform, data.constraints]
+    .filter((value): value is string => Boolean(value))
+    .join("\n");
+}
+
+// Same text for a raw payload, or null when it fails validation.
+export function buildDedupInput(json: unknown): string | null {
+  const parsed = createIdeaSchema.safeParse(json);
+  return parsed.success ? dedupInputFor(parsed.data) : null;
+}
+
+// Validates, moderates, merges or creates one idea. Shared by the single and bulk endpoints;
+// identity and rate limiting stay with the caller.
+export async function submitIdea(json: unknown, submitter: IdeaSubmitter): Promise<SubmissionOutcome> {
+  const { anonId, userId } = submitter;
+  const parsed = createIdeaSchema.safeParse(json);
+
+  if (!parsed.success) {
+    return { status: 400, body: { error: parsed.error.flatten() } };
+  }
+
+  const sourceTag = normalizeSourceTag(parsed.data.source_tag);
+  const cleanedRawInputText = stripSocialRequirementPrefix(parsed.data.raw_input_text);
+
+  const moderation = findBlockedContent(cleanedRawInputText, parsed.data.target_users, parsed.data.constraints);
+  if (moderation.blocked) {
+    return {
+      status: 400,
+      body: {
+        error: "Submission blocked: obvious offensive or inappropriate language detected. Please revise and submit again.",
+        labels: moderation.labels,
+      },
+    };
+  }
+
+  const dedupInput = dedupInputFor(parsed.data);
+
+  const candidates = await prisma.idea.findMany({
+    orderBy: { createdAt: "desc" },
+    take: 500,
+    select: {
+      id: true,
+      rawInputText: true,
+      title: true,
+      problemStatement: true,
+    },
+  });
+
+  const mergeTarget = detectMergeTarget(
+    dedupInput,
+    candidates.map((candidate) => ({
+      id: candidate.id,
+      text: `${candidate.rawInputText}\n${candidate.title}\n${candidate.problemStatement}`,
+    }))
+  );
+
+  if (mergeTarget) {
+    const existing = await prisma.idea.findUnique({ where: { id: mergeTarget.targetIdeaId } });
+
+    if (existing) {
+      if (sourceTag) {
+        const existingTags = parseJsonArray<string>(existing.tags);
+        const mergedTags = mergeIdeaTags(existingTags, [sourceTag]);
+        if (mergedTags.length !== existingTags.length) {
+          await prisma.idea.update({
+            where: { id: existing.id },
+            data: { tags: JSON.stringify(mergedTags) },
+          });
+        }
+      }
+
+      await prisma.ideaMerge.create({
+        data: {
+          targetIdeaId: existing.id,
+          mergedByAnonId: anonId || null,
+          mergedByUserId: userId,
+          rawInputText: cleanedRawInputText,
+          targetUsers: parsed.data.target_users,
+          platform: parsed.data.platform,
+          constraints: parsed.data.constraints,
+          reason: mergeTarget.reason,
+          similarityScore: mergeTarget.similarityScore,
+        },
+      });
+
+      await applyMergeSupportVote(existing.id, userId, anonId || null);
+
+      const existingTitle = buildMeaningfulTitle({
+        rawInputText: existing.rawInputText,
+        title: existing.title,
+        problemStatement: existing.problemStatement,
+      });
+
+      return {
+        status: 200,
+        body: {
+          merged: true,
+          reason: mergeTarget.reason,
+          message:
+            mergeTarget.reason === "SUBSET"
+              ? "Your submission is a subset of an existing idea and has been merged into that thread."
+              : "Your submission matches an existing idea and has been merged into that thread.",
+          idea: {
+            id: existing.id,
+            title: existingTitle,
+          },
+        },
+      };
+    }
+  }
+
+  try {
+    const spec = await generateSpec(parsed.data);
+    const cleanedProblemStatement = cleanProblemStatement(spec.problem_statement, cleanedRawInputText);
+    const displayTitle = buildMeaningfulTitle({
+      rawInputText: cleanedRawInputText,
+      title: spec.title,
+      problemStatement: cleanedProblemStatement,
+    });
+
+    let submitterVisibleName: string | null = null;
+    const isAnonymous = !(parsed.data.show_name && userId);
+
+    if (!isAnonymous && userId) {
+      const profile = await prisma.developerProfile.findUnique({ where: { userId } });
+      submitterVisibleName = profile?.displayName || submitter.fallbackName || "Member";
+    }
+
+    const ideaTags = mergeIdeaTags(Array.isArray(spec.tags) ? spec.tags : [], sourceTag ? [sourceTag] : []);
+
+    const idea = await prisma.idea.create({
+      data: {
+        createdByAnonId: anonId || null,
+        createdByUserId: userId,
+        isAnonymous,
+        submitterVisibleName,
+        rawInputText: cleanedRawInputText,
+        targetUsers: parsed.data.target_users,
+        platform: parsed.data.platform,
+        constraints: parsed.data.constraints,
+        title: displayTitle,
+        problemStatement: cleanedProblemStatement,
+        tags: JSON.stringify(ideaTags),
+        features: JSON.stringify(spec.features),
+        openQuestions: JSON.stringify(spec.open_questions),
+        tasks: {
+          create: spec.tasks.map((task) => ({
+            title: task.title,
+            description: task.description,
+            acceptance: JSON.stringify(task.acceptance_criteria),
+            effort: task.effort,
+            status: "OPEN",
+          })),
+        },
+      },
+      include: { tasks: { include: { links: true } } },
+    });
+
+    return {
+      status: 201,
+      body: {
+        idea: {
+          ...mapIdea(idea),
+          title: displayTitle,
+          submitter_label: idea.isAnonymous ? "Anonymous" : submitterVisibleName || "Member",
+          tasks: idea.tasks.map((task) => ({
+            ...mapTask(task),
+            claimantNickname: null,
+            claimantDisplayName: null,
+          })),
+        },
+      },
+    };
+  } catch (error) {
+    return { status: 500, body: { error: "Failed to generate idea spec", detail: String(error) } };
+  }
+}
@@ -4,12 +4,27 @@ from __future__ import annotations
 import argparse
 import hashlib
 import json
-import uuid
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# The workflow runs this file as a script; the pipeline package is importable from the repo root.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from posting_state import PostingState, minhash_signature, signature_similarity  # noqa: E402
+from src.web_user_summary.artifacts import load_clusters  # noqa: E402
+
+FALLBACK_CLUSTER_FIELDS = ("cluster_id", "summary_demand", "demand_count", "examples")
+
+
+# Outcomes where this run created or merged an idea on the site.
+POSTED_STATUSES = {"posted", "merged"}
 
 
 def parse_args() -> argparse.Namespace:
@@ -24,12 +39,70 @@ def parse_args() -> argparse.Namespace:
         default="",
         help="Run directory with llm_requirement_accepted_curated.json (default: latest under data/social_requirements).",
     )
+    parser.add_argument(
+        "--state-log",
+        default="data/social_requirements/posting_log.jsonl",
+        help="Append-only JSONL log of posted keys, signatures and runs; the record kept in git.",
+    )
     parser.add_argument(
         "--state-file",
+        default="data/social_requirements/posting_state.sqlite3",
+        help="Local SQLite index over --state-log used for dedupe; rebuilt from the log when missing or stale.",
+    )
+    parser.add_argument(
+        "--legacy-state-file",
         default="data/social_requirements/posting_state.json",
-        help="Path to posting state file for dedupe.",
+        help="Old JSON posting state converted into --state-log when the log does not exist yet.",
+    )
+    parser.add_argument(
+        "--runs-retention-days",
+        type=float,
+        default=90.0,
+        help="Drop run history entries older than this many days.",
+    )
+    parser.add_argument(
+        "--near-dup-threshold",
+        type=float,
+        default=0.7,
+        help="Estimated Jaccard similarity to an already posted requirement that counts as a near-duplicate (0 disables).",
+    )
+    parser.add_argument(
+        "--near-dup-action",
+        choices=["skip", "flag"],
+        default="skip",
+        help="skip: do not submit near-duplicates; flag: submit them but mark them in the report.",
+    )
+    parser.add_argument(
+        "--backfill-signatures",
+        type=int,
+        default=100,
+        help="Fetch up to this many earlier posted ideas per run that have no near-duplicate signature (0 disables).",
     )
     parser.add_argument("--timeout-s", type=int, default=60)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent single-idea submissions. The site's duplicate check only sees ideas already stored, so "
+        "near-identical requirements posted by different workers at the same time can each create an idea; "
+        "use 1 when that matters.",
+    )
+    parser.add_argument(
+        "--bulk-size",
+        type=int,
+        default=0,
+        help="Ideas per request to /api/ideas/bulk (default 0: single posts). Falls back to single posts if the "
+        "site lacks the endpoint. Batches are sent one at a time; the server runs similar ideas in order and up "
+        "to 4 unrelated ones at once, so keep batches small enough to finish within --timeout-s and the "
+        "deployment's request time limit.",
+    )
+    parser.add_argument(
+        "--warm-up",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="GET the site root first to wake a sleeping deployment.",
+    )
+    parser.add_argument("--retries", type=int, default=3, help="Retries with backoff on 429/5xx and connection errors.")
     parser.add_argument("--dry-run", action="store_true")
     return parser.parse_args()
 
@@ -44,14 +117,16 @@ def latest_run_dir(base: Path) -> Path:
 def load_accepted_requirements(run_dir: Path) -> List[Dict]:
     curated = run_dir / "llm_requirement_accepted_curated.json"
     raw = run_dir / "llm_requirement_accepted.json"
-    clusters_file = run_dir / "demand_clusters.json"
     if curated.exists():
         return json.loads(curated.read_text(encoding="utf-8")).get("accepted", [])
     if raw.exists():
         return json.loads(raw.read_text(encoding="utf-8")).get("accepted", [])
-    if clusters_file.exists():
-        payload = json.loads(clusters_file.read_text(encoding="utf-8"))
-        clusters = payload.get("clusters", [])
+    try:
+        # Any artifact format the collector wrote: demand_clusters.json, compact JSONL or Parquet.
+        _, clusters = load_clusters(run_dir, fields=FALLBACK_CLUSTER_FIELDS)
+    except FileNotFoundError:
+        clusters = None
+    if clusters is not None:
         accepted = []
         for cluster in clusters[:20]:
             summary = str(cluster.get("summary_demand", "")).strip()
@@ -72,17 +147,6 @@ def load_accepted_requirements(run_dir: Path) -> List[Dict]:
     raise FileNotFoundError(f"No accepted requirements JSON or demand_clusters fallback found in {run_dir}")
 
 
-def load_state(path: Path) -> Dict:
-    if path.exists():
-        return json.loads(path.read_text(encoding="utf-8"))
-    return {"anon_id": str(uuid.uuid4()), "posted_keys": {}, "runs": []}
-
-
-def save_state(path: Path, state: Dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
-
-
 def requirement_key(item: Dict) -> str:
     material = "|".join(
         [
@@ -136,6 +200,189 @@ def post_idea(session: requests.Session, site_url: str, anon_id: str, payload: D
     return resp.status_code, body
 
 
+def fetch_idea_requirement(
+    session: requests.Session, site_url: str, anon_id: str, idea_id: str, timeout_s: int
+) -> Optional[str]:
+    # The requirement is the first line of the rawInputText this script posted. "" means the idea is
+    # gone; None means the request failed and is worth retrying on a later run.
+    endpoint = site_url.rstrip("/") + f"/api/ideas/{idea_id}"
+    resp = session.get(endpoint, headers={"x-anon-id": anon_id}, timeout=timeout_s)
+    if resp.status_code == 404:
+        return ""
+    if resp.status_code != 200:
+        return None
+    try:
+        raw = str((resp.json().get("idea") or {}).get("rawInputText", "")).strip()
+    except ValueError:
+        return None
+    return raw.splitlines()[0].strip() if raw else ""
+
+
+def backfill_signatures(
+    session: requests.Session, site_url: str, anon_id: str, state: PostingState, limit: int, workers: int, timeout_s: int
+) -> Tuple[int, int, int]:
+    # Posts converted from the JSON state only dedupe by exact key until their text is fetched back.
+    # A merged post stores the target idea, whose text stands in for the one that was merged into it.
+    # Returns (signed, unavailable, still missing).
+    pending = state.unsigned_posts()
+    batch = pending[: max(0, limit)]
+
+    def fetch(idea_id: str) -> Optional[str]:
+        try:
+            return fetch_idea_requirement(session, site_url, anon_id, idea_id, timeout_s)
+        except requests.RequestException:
+            return None
+
+    signed = unavailable = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for (key, _), requirement in zip(batch, pool.map(fetch, [idea_id for _, idea_id in batch])):
+            if requirement is None:
+                continue
+            state.add_signature(key, requirement)
+            if requirement:
+                signed += 1
+            else:
+                unavailable += 1
+    return signed, unavailable, len(pending) - signed - unavailable
+
+
+def post_ideas_bulk(
+    session: requests.Session, site_url: str, anon_id: str, payloads: List[Dict], timeout_s: int
+) -> Optional[List[Tuple[int, Dict]]]:
+    # None means the site has no bulk endpoint. The whole batch shares one request timeout, the
+    # same budget a hosted deployment gives the server to answer it.
+    endpoint = site_url.rstrip("/") + "/api/ideas/bulk"
+    headers = {"x-anon-id": anon_id, "Content-Type": "application/json"}
+    resp = session.post(endpoint, headers=headers, json={"ideas": payloads}, timeout=timeout_s)
+    if resp.status_code in {404, 405}:
+        return None
+    try:
+        body = resp.json()
+    except Exception:
+        body = {"raw": resp.text[:600]}
+    results = body.get("results") if resp.status_code == 200 else None
+    if not isinstance(results, list) or len(results) != len(payloads):
+        return [(resp.status_code, body)] * len(payloads)
+    return [(int(r.get("status", 0)), r.get("body", {}) or {}) for r in results]
+
+
+# Statuses where the server promises it did not act on the request and says when to come back.
+POST_RETRY_STATUSES = frozenset({429, 503})
+
+
+class PostSafeRetry(Retry):
+    # Creating an idea is not idempotent: a POST that timed out or hit a 5xx may already have been
+    # stored, and a replay then races the server-side dedup. Connect errors are still retried for
+    # every method (the request never left), but a POST response is only replayed on a 429/503
+    # that carries Retry-After.
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() == "POST":
+            return bool(self.total) and has_retry_after and status_code in POST_RETRY_STATUSES
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def build_session(pool_size: int, retries: int) -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"User-Agent": "youtube-trend-skill-codex/requirements-poster/0.1"})
+    retry = PostSafeRetry(
+        total=retries,
+        backoff_factor=1.0,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def build_payload(item: Dict) -> Dict:
+    return {
+        "raw_input_text": build_raw_input_text(item),
+        "target_users": "People who need practical productivity and workflow tools",
+        "platform": "Web",
+        "constraints": "Prefer simple setup and low friction.",
+        "source_tag": "_social_",
+        "show_name": False,
+    }
+
+
+def already_posted_result(cluster_id: str, requirement: str, entry: Dict) -> Dict:
+    return {
+        "cluster_id": cluster_id,
+        "requirement": requirement,
+        "status": "already_posted",
+        "idea_id": entry.get("idea_id"),
+        "message": "Skipped because this requirement key already exists in posting_state.",
+    }
+
+
+def find_near_duplicate(
+    state: PostingState,
+    signature: Tuple[int, ...],
+    run_signatures: List[Tuple[str, Tuple[int, ...]]],
+    threshold: float,
+) -> Optional[Dict]:
+    # Previously posted requirements come from the LSH index; ones planned earlier in this run are
+    # compared directly since they are not posted yet.
+    best: Optional[Dict] = None
+    match = state.near_duplicate(signature, threshold)
+    if match is not None:
+        entry = state.get(match[0]) or {}
+        best = {"cluster_id": entry.get("cluster_id"), "idea_id": entry.get("idea_id"), "similarity": match[1]}
+    for cluster_id, other in run_signatures:
+        similarity = signature_similarity(signature, other)
+        if similarity >= threshold and (best is None or similarity > best["similarity"]):
+            best = {"cluster_id": cluster_id, "idea_id": None, "similarity": similarity}
+    return best
+
+
+def near_duplicate_result(cluster_id: str, requirement: str, match: Dict) -> Dict:
+    return {
+        "cluster_id": cluster_id,
+        "requirement": requirement,
+        "status": "near_duplicate",
+        "idea_id": match.get("idea_id"),
+        "near_duplicate_of": match,
+        "message": f"Skipped because it is {match['similarity']:.0%} similar to cluster {match['cluster_id']}.",
+    }
+
+
+def record_post(item: Dict, key: str, status: int, body: Dict, state: PostingState) -> Dict:
+    cluster_id = str(item.get("cluster_id", ""))
+    requirement = str(item.get("requirement", item.get("normalized_requirement", ""))).strip()
+    if status == 201:
+        idea_id = body.get("idea", {}).get("id")
+        state.record(key, idea_id, cluster_id)
+        state.add_signature(key, requirement)
+        return {
+            "cluster_id": cluster_id,
+            "requirement": requirement,
+            "status": "posted",
+            "idea_id": idea_id,
+            "message": "Created new idea.",
+        }
+    if status == 200 and body.get("merged"):
+        idea_id = body.get("idea", {}).get("id")
+        state.record(key, idea_id, cluster_id)
+        state.add_signature(key, requirement)
+        return {
+            "cluster_id": cluster_id,
+            "requirement": requirement,
+            "status": "merged",
+            "idea_id": idea_id,
+            "message": body.get("message", "Merged into existing idea."),
+        }
+    return {
+        "cluster_id": cluster_id,
+        "requirement": requirement,
+        "status": "failed",
+        "message": f"HTTP {status}: {body}",
+    }
+
+
 def render_report(run_dir: Path, results: List[Dict]) -> None:
     out_json = run_dir / "posted_to_demandsolution.json"
     out_md = run_dir / "posted_to_demandsolution.md"
@@ -146,7 +393,8 @@ def render_report(run_dir: Path, results: List[Dict]) -> None:
         "",
         f"- Generated at: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}",
         f"- Total processed: {len(results)}",
-        f"- Posted/merged: {sum(1 for r in results if r['status'] in {'posted', 'merged', 'already_posted'})}",
+        f"- Posted/merged: {sum(1 for r in results if r['status'] in POSTED_STATUSES)}",
+        f"- Near-duplicates: {sum(1 for r in results if r.get('near_duplicate_of'))}",
         "",
         "## Details",
         "",
@@ -158,6 +406,9 @@ def render_report(run_dir: Path, results: List[Dict]) -> None:
             lines.append(f"   - message: {result['message']}")
         if result.get("idea_id"):
             lines.append(f"   - idea_id: `{result['idea_id']}`")
+        if result.get("near_duplicate_of"):
+            match = result["near_duplicate_of"]
+            lines.append(f"   - near-duplicate of: `{match['cluster_id']}` ({match['similarity']:.0%})")
     out_md.write_text("\n".join(lines).strip() + "\n", encoding="utf-8")
 
 
@@ -166,111 +417,147 @@ def main() -> None:
     root = Path(__file__).resolve().parents[1]
     base_data = root / "data" / "social_requirements"
     run_dir = Path(args.input_dir) if args.input_dir else latest_run_dir(base_data)
+    state_log = root / args.state_log if not Path(args.state_log).is_absolute() else Path(args.state_log)
     state_file = root / args.state_file if not Path(args.state_file).is_absolute() else Path(args.state_file)
+    legacy_file = root / args.legacy_state_file if not Path(args.legacy_state_file).is_absolute() else Path(args.legacy_state_file)
 
     accepted = load_accepted_requirements(run_dir)
-    state = load_state(state_file)
-    anon_id = state.get("anon_id") or str(uuid.uuid4())
-    state["anon_id"] = anon_id
-    posted_keys = state.setdefault("posted_keys", {})
-    results: List[Dict] = []
-
-    session = requests.Session()
-    session.headers.update({"User-Agent": "youtube-trend-skill-codex/requirements-poster/0.1"})
-    try:
-        session.get(args.site_url.rstrip("/") + "/", timeout=min(20, args.timeout_s))
-    except Exception:
-        pass
+    # Each post is appended to the log as soon as its response is recorded, so a crash keeps earlier posts.
+    state = PostingState(state_file, state_log, legacy_json=legacy_file)
+    anon_id = state.anon_id
+
+    session = build_session(pool_size=max(1, args.workers), retries=args.retries)
+    if args.warm_up:
+        try:
+            session.get(args.site_url.rstrip("/") + "/", timeout=min(20, args.timeout_s))
+        except Exception:
+            pass
+    backfill = backfill_signatures(
+        session, args.site_url, anon_id, state, args.backfill_signatures, args.workers, args.timeout_s
+    )
 
-    for item in accepted:
+    # Plan in input order: known keys are skipped, and repeats of a key within this run wait for the
+    # first occurrence so dedupe matches one-by-one posting. First occurrences are posted concurrently.
+    slots: List[Optional[Dict]] = [None] * len(accepted)
+    to_post: List[Tuple[int, str, Dict]] = []
+    repeats: List[Tuple[int, str]] = []
+    flagged: Dict[int, Dict] = {}
+    planned: set = set()
+    run_signatures: List[Tuple[str, Tuple[int, ...]]] = []
+    for idx, item in enumerate(accepted):
         cluster_id = str(item.get("cluster_id", ""))
         requirement = str(item.get("requirement", item.get("normalized_requirement", ""))).strip()
         key = requirement_key(item)
-        if key in posted_keys:
-            results.append(
-                {
-                    "cluster_id": cluster_id,
-                    "requirement": requirement,
-                    "status": "already_posted",
-                    "idea_id": posted_keys[key].get("idea_id"),
-                    "message": "Skipped because this requirement key already exists in posting_state.",
-                }
-            )
+        entry = state.get(key)
+        if entry is not None:
+            slots[idx] = already_posted_result(cluster_id, requirement, entry)
             continue
-
-        payload = {
-            "raw_input_text": build_raw_input_text(item),
-            "target_users": "People who need practical productivity and workflow tools",
-            "platform": "Web",
-            "constraints": "Prefer simple setup and low friction.",
-            "source_tag": "_social_",
-            "show_name": False,
-        }
-
+        if key in planned:
+            repeats.append((idx, key))
+            continue
+        match = None
+        if args.near_dup_threshold > 0:
+            signature = minhash_signature(requirement)
+            match = find_near_duplicate(state, signature, run_signatures, args.near_dup_threshold)
+            if match is not None and args.near_dup_action == "skip":
+                slots[idx] = near_duplicate_result(cluster_id, requirement, match)
+                continue
+            run_signatures.append((cluster_id, signature))
         if args.dry_run:
-            results.append(
-                {
-                    "cluster_id": cluster_id,
-                    "requirement": requirement,
-                    "status": "dry_run",
-                    "message": "Prepared payload only; not submitted.",
-                }
-            )
+            slots[idx] = {
+                "cluster_id": cluster_id,
+                "requirement": requirement,
+                "status": "dry_run",
+                "message": "Prepared payload only; not submitted.",
+            }
+            if match is not None:
+                slots[idx]["near_duplicate_of"] = match
             continue
-
-        status, body = post_idea(session, args.site_url, anon_id, payload, args.timeout_s)
-
-        if status == 201:
-            idea_id = body.get("idea", {}).get("id")
-            posted_keys[key] = {"idea_id": idea_id, "cluster_id": cluster_id, "posted_at": datetime.now(timezone.utc).isoformat()}
-            results.append(
-                {
-                    "cluster_id": cluster_id,
-                    "requirement": requirement,
-                    "status": "posted",
-                    "idea_id": idea_id,
-                    "message": "Created new idea.",
-                }
-            )
-        elif status == 200 and body.get("merged"):
-            idea_id = body.get("idea", {}).get("id")
-            posted_keys[key] = {"idea_id": idea_id, "cluster_id": cluster_id, "posted_at": datetime.now(timezone.utc).isoformat()}
-            results.append(
-                {
-                    "cluster_id": cluster_id,
-                    "requirement": requirement,
-                    "status": "merged",
-                    "idea_id": idea_id,
-                    "message": body.get("message", "Merged into existing idea."),
-                }
-            )
+        planned.add(key)
+        to_post.append((idx, key, build_payload(item)))
+        if match is not None:
+            flagged[idx] = match
+
+    workers = max(1, args.workers)
+    if args.bulk_size > 1 and len(to_post) > 1:
+        batches = [to_post[i : i + args.bulk_size] for i in range(0, len(to_post), args.bulk_size)]
+
+        def send(batch: List[Tuple[int, str, Dict]]) -> Optional[List[Tuple[int, Dict]]]:
+            try:
+                return post_ideas_bulk(session, args.site_url, anon_id, [p for _, _, p in batch], args.timeout_s)
+            except requests.RequestException as exc:
+                return [(0, {"error": str(exc)})] * len(batch)
+
+        # Batches go out one after another and the server runs similar items of a batch in order, so
+        # every item is checked against all earlier ones, as with --workers 1. The first batch doubles
+        # as the probe for bulk support.
+        outcomes = send(batches[0])
+        if outcomes is None:
+            print("Bulk endpoint unavailable; falling back to single posts.")
         else:
-            results.append(
-                {
-                    "cluster_id": cluster_id,
-                    "requirement": requirement,
-                    "status": "failed",
-                    "message": f"HTTP {status}: {body}",
-                }
-            )
-
-    state.setdefault("runs", []).append(
-        {
-            "run_dir": str(run_dir),
-            "posted_at": datetime.now(timezone.utc).isoformat(),
-            "results_count": len(results),
-            "posted_count": sum(1 for r in results if r["status"] in {"posted", "merged"}),
+            to_post = []
+            for batch_no, batch in enumerate(batches):
+                batch_outcomes = outcomes if batch_no == 0 else send(batch)
+                if batch_outcomes is None:
+                    to_post.extend(batch)
+                    continue
+                for (idx, key, _), (status, body) in zip(batch, batch_outcomes):
+                    slots[idx] = record_post(accepted[idx], key, status, body, state)
+
+    # Concurrent posts race the server's detectMergeTarget: each request only compares against ideas
+    # already committed, so two similar requirements in flight together can both be created.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(post_idea, session, args.site_url, anon_id, payload, args.timeout_s): (idx, key)
+            for idx, key, payload in to_post
         }
+        for future in as_completed(futures):
+            idx, key = futures[future]
+            try:
+                status, body = future.result()
+            except requests.RequestException as exc:
+                status, body = 0, {"error": str(exc)}
+            slots[idx] = record_post(accepted[idx], key, status, body, state)
+
+    for idx, key in repeats:
+        item = accepted[idx]
+        entry = state.get(key)
+        if entry is not None:
+            cluster_id = str(item.get("cluster_id", ""))
+            requirement = str(item.get("requirement", item.get("normalized_requirement", ""))).strip()
+            slots[idx] = already_posted_result(cluster_id, requirement, entry)
+            continue
+        try:
+            status, body = post_idea(session, args.site_url, anon_id, build_payload(item), args.timeout_s)
+        except requests.RequestException as exc:
+            status, body = 0, {"error": str(exc)}
+        slots[idx] = record_post(item, key, status, body, state)
+    for idx, match in flagged.items():
+        slots[idx]["near_duplicate_of"] = match
+    results: List[Dict] = [r for r in slots if r is not None]
+
+    state.add_run(
+        str(run_dir),
+        results_count=len(results),
+        posted_count=sum(1 for r in results if r["status"] in POSTED_STATUSES),
+        retention_days=args.runs_retention_days,
     )
-
-    save_state(state_file, state)
+    state.close()
     render_report(run_dir, results)
 
     print(f"Source run: {run_dir}")
     print(f"Target site: {args.site_url}")
     print(f"Processed requirements: {len(results)}")
-    print(f"Posted or merged: {sum(1 for r in results if r['status'] in {'posted', 'merged', 'already_posted'})}")
-    print(f"State file: {state_file}")
+    print(f"Posted or merged: {sum(1 for r in results if r['status'] in POSTED_STATUSES)}")
+    print(f"Near-duplicates {'skipped' if args.near_dup_action == 'skip' else 'flagged'}: "
+          f"{sum(1 for r in results if r.get('near_duplicate_of'))}")
+    print(f"Signatures backfilled from the site: {backfill[0]} (ideas gone: {backfill[1]})")
+    if backfill[2]:
+        print(
+            f"Posts still without a signature: {backfill[2]}. They were recorded before the requirement text "
+            "was kept, so they only dedupe by exact key until --backfill-signatures fetches them."
+        )
+    print(f"State log: {state_log}")
     print(f"Report JSON: {run_dir / 'posted_to_demandsolution.json'}")
     print(f"Report MD: {run_dir / 'posted_to_demandsolution.md'}")
 
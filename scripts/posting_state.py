@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import uuid
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posted_keys (
+    key TEXT PRIMARY KEY,
+    idea_id TEXT,
+    cluster_id TEXT NOT NULL,
+    posted_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_dir TEXT NOT NULL,
+    posted_at TEXT NOT NULL,
+    results_count INTEGER NOT NULL,
+    posted_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_posted_at ON runs (posted_at);
+CREATE TABLE IF NOT EXISTS signatures (
+    key TEXT PRIMARY KEY,
+    requirement TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signature_bands (
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signature_bands_lookup ON signature_bands (band, bucket);
+"""
+
+# MinHash over character shingles: short, lightly reworded requirements still share most 5-grams.
+SHINGLE_SIZE = 5
+NUM_HASHES = 64
+# 16 bands x 4 rows puts the LSH candidate cut-off near 0.5 estimated Jaccard.
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240607)
+_HASH_PARAMS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_HASHES)]
+
+
+def shingles(text: str) -> Set[str]:
+    normalized = " ".join(re.findall(r"\w+", text.lower()))
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i : i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    hashed = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles(text)]
+    if not hashed:
+        return tuple([_MERSENNE_PRIME] * NUM_HASHES)
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashed) for a, b in _HASH_PARAMS)
+
+
+def signature_similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    # Share of agreeing MinHash slots estimates the Jaccard similarity of the shingle sets.
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_HASHES
+
+
+def _band_buckets(signature: Sequence[int]) -> Iterable[Tuple[int, str]]:
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        yield band, hashlib.blake2b(repr(rows).encode("ascii"), digest_size=8).hexdigest()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PostingState:
+    # posting_log.jsonl is the record of truth: one JSON object per line, only ever appended, so it
+    # diffs and merges like text in git. The SQLite file is a local index over it that catches up on
+    # the new lines when opened, and is rebuilt if the part of the log it indexed has changed.
+    # Every write is appended to the log first, so a crash keeps everything posted so far.
+    def __init__(self, path: Path, log_path: Path, legacy_json: Optional[Path] = None) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.log_path = log_path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(SCHEMA)
+        if not log_path.exists() and legacy_json is not None and legacy_json.exists():
+            self.migrate_json(legacy_json)
+        self._catch_up()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _meta(self, name: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _catch_up(self) -> None:
+        data = self.log_path.read_bytes() if self.log_path.exists() else b""
+        offset = int(self._meta("log_offset") or 0)
+        indexed = hashlib.sha256(data[:offset]).hexdigest()
+        with self.conn:
+            if offset > len(data) or indexed != self._meta("log_sha256"):
+                for table in ("meta", "posted_keys", "runs", "signatures", "signature_bands"):
+                    self.conn.execute(f"DELETE FROM {table}")
+                offset = 0
+            # A torn last line (a crash mid-append) is skipped here and cut off by the next append.
+            end = data.rfind(b"\n") + 1
+            for line in data[offset:end].splitlines():
+                if line.strip():
+                    self._apply(json.loads(line))
+            if end > offset:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                    [("log_offset", str(end)), ("log_sha256", hashlib.sha256(data[:end]).hexdigest())],
+                )
+
+    def _append(self, records: Sequence[Dict]) -> None:
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+        with self.log_path.open("a+b") as f:
+            f.seek(0)
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                f.truncate(end)
+            f.write(lines.encode("utf-8"))
+        self._catch_up()
+
+    def _apply(self, record: Dict) -> None:
+        kind = record.get("type")
+        if kind == "meta" and record.get("anon_id"):
+            self.conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('anon_id', ?)", (str(record["anon_id"]),))
+        elif kind == "posted":
+            self.conn.execute(
+                "INSERT INTO posted_keys (key, idea_id, cluster_id, posted_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET idea_id = excluded.idea_id, cluster_id = excluded.cluster_id, "
+                "posted_at = excluded.posted_at",
+                (record["key"], record.get("idea_id"), str(record.get("cluster_id", "")), str(record.get("posted_at", ""))),
+            )
+        elif kind == "signature":
+            key, requirement = record["key"], str(record.get("requirement", ""))
+            signature = minhash_signature(requirement)
+            self.conn.execute("DELETE FROM signature_bands WHERE key = ?", (key,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO signatures (key, requirement, signature) VALUES (?, ?, ?)",
+                (key, requirement, array("Q", signature).tobytes()),
+            )
+            # An empty requirement marks a key whose text could not be recovered; it never matches.
+            if requirement:
+                self.conn.executemany(
+                    "INSERT INTO signature_bands (band, bucket, key) VALUES (?, ?, ?)",
+                    [(band, bucket, key) for band, bucket in _band_buckets(signature)],
+                )
+        elif kind == "run":
+            self.conn.execute(
+                "INSERT INTO runs (run_dir, posted_at, results_count, posted_count) VALUES (?, ?, ?, ?)",
+                (
+                    str(record.get("run_dir", "")),
+                    str(record.get("posted_at", "")),
+                    int(record.get("results_count", 0)),
+                    int(record.get("posted_count", 0)),
+                ),
+            )
+
+    def migrate_json(self, legacy_json: Path) -> int:
+        # One-time conversion of the old posting_state.json into the log. It never stored the posted
+        # requirement text, so migrated keys have no near-duplicate signature.
+        state = json.loads(legacy_json.read_text(encoding="utf-8"))
+        posted = state.get("posted_keys", {}) or {}
+        records: List[Dict] = []
+        if state.get("anon_id"):
+            records.append({"type": "meta", "anon_id": str(state["anon_id"])})
+        records.extend(
+            {
+                "type": "posted",
+                "key": key,
+                "idea_id": entry.get("idea_id"),
+                "cluster_id": str(entry.get("cluster_id", "")),
+                "posted_at": str(entry.get("posted_at", "")),
+            }
+            for key, entry in posted.items()
+        )
+        records.extend(
+            {
+                "type": "run",
+                "run_dir": str(run.get("run_dir", "")),
+                "posted_at": str(run.get("posted_at", "")),
+                "results_count": int(run.get("results_count", 0)),
+                "posted_count": int(run.get("posted_count", 0)),
+            }
+            for run in state.get("runs", []) or []
+        )
+        self._append(records)
+        return len(posted)
+
+    @property
+    def anon_id(self) -> str:
+        value = self._meta("anon_id")
+        if value is None:
+            self._append([{"type": "meta", "anon_id": str(uuid.uuid4())}])
+            value = self._meta("anon_id")
+        return value
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT idea_id, cluster_id, posted_at FROM posted_keys WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"idea_id": row[0], "cluster_id": row[1], "posted_at": row[2]}
+
+    def __contains__(self, key: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM posted_keys WHERE key = ?", (key,)).fetchone() is not None
+
+    def record(self, key: str, idea_id: Optional[str], cluster_id: str) -> Dict:
+        entry = {"idea_id": idea_id, "cluster_id": cluster_id, "posted_at": _now_iso()}
+        self._append([{"type": "posted", "key": key, **entry}])
+        return entry
+
+    def add_signature(self, key: str, requirement: str) -> None:
+        # Only the text is logged; the MinHash signature is recomputed from it when indexing.
+        self._append([{"type": "signature", "key": key, "requirement": requirement}])
+
+    def unsigned_posts(self) -> List[Tuple[str, str]]:
+        # (key, idea_id) of posts without a signature, oldest first. These are the entries converted
+        # from posting_state.json, which never stored the requirement text.
+        return self.conn.execute(
+            "SELECT p.key, p.idea_id FROM posted_keys p LEFT JOIN signatures s ON s.key = p.key "
+            "WHERE s.key IS NULL AND COALESCE(p.idea_id, '') != '' ORDER BY p.posted_at, p.key"
+        ).fetchall()
+
+    def near_duplicate(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[str, float]]:
+        # Best previously posted (key, similarity) at or above threshold, found via LSH band buckets.
+        candidates: List[str] = []
+        for band, bucket in _band_buckets(signature):
+            rows = self.conn.execute(
+                "SELECT key FROM signature_bands WHERE band = ? AND bucket = ?", (band, bucket)
+            ).fetchall()
+            candidates.extend(r[0] for r in rows)
+        best: Optional[Tuple[str, float]] = None
+        for key in dict.fromkeys(candidates):
+            row = self.conn.execute("SELECT signature FROM signatures WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                continue
+            stored = array("Q")
+            stored.frombytes(row[0])
+            similarity = signature_similarity(signature, stored)
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def add_run(self, run_dir: str, results_count: int, posted_count: int, retention_days: float) -> int:
+        # The log keeps every run; only the index drops rows outside the retention window. Returns how
+        # many index rows were dropped.
+        self._append(
+            [
+                {
+                    "type": "run",
+                    "run_dir": run_dir,
+                    "posted_at": _now_iso(),
+                    "results_count": results_count,
+                    "posted_count": posted_count,
+                }
+            ]
+        )
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+        with self.conn:
+            pruned = self.conn.execute("DELETE FROM runs WHERE posted_at < ?", (cutoff,)).rowcount
+        return pruned
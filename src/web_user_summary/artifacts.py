@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Both are optional (requirements-social-extras.txt): without zstandard compact JSONL falls back to
+# gzip, and without pyarrow no Parquet copy of the clusters is written.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+    parquet = None
+
+ARTIFACT_FORMATS = ("json", "compact")
+CLUSTERS_STEM = "demand_clusters"
+
+
+def compact_jsonl_suffix() -> str:
+    return ".jsonl.zst" if zstandard is not None else ".jsonl.gz"
+
+
+def jsonl_name(stem: str, artifact_format: str) -> str:
+    return stem + (compact_jsonl_suffix() if artifact_format == "compact" else ".jsonl")
+
+
+def open_text(path: Path, mode: str) -> IO[str]:
+    # mode is "r" or "w"; the codec follows the file suffix.
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required for {path}. Install it with: pip install zstandard")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+def _project(row: Dict, fields: Optional[Sequence[str]]) -> Dict:
+    return row if fields is None else {k: row[k] for k in fields if k in row}
+
+
+def iter_jsonl(path: Path, fields: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+    with open_text(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _project(json.loads(line), fields)
+
+
+def find_jsonl(run_dir: Path, stem: str) -> Optional[Path]:
+    # Compressed copies win over plain JSONL.
+    for suffix in (".jsonl.zst", ".jsonl.gz", ".jsonl"):
+        path = run_dir / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def write_compact_clusters(out_dir: Path, meta: Dict, rows: List[Dict]) -> List[Path]:
+    # demand_clusters.json split into a small meta file, one compressed JSONL row per cluster,
+    # and a Parquet copy when pyarrow is available so readers can load single columns.
+    written = [out_dir / f"{CLUSTERS_STEM}.meta.json", out_dir / f"{CLUSTERS_STEM}{compact_jsonl_suffix()}"]
+    written[0].write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    with open_text(written[1], "w") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    if pyarrow is not None and rows:
+        path = out_dir / f"{CLUSTERS_STEM}.parquet"
+        parquet.write_table(pyarrow.Table.from_pylist(rows), path, compression="zstd")
+        written.append(path)
+    return written
+
+
+def load_clusters(run_dir: Path, fields: Optional[Sequence[str]] = None) -> Tuple[Dict, List[Dict]]:
+    # Reads whichever cluster artifact the run has: Parquet, compact JSONL, then demand_clusters.json.
+    meta_path = run_dir / f"{CLUSTERS_STEM}.meta.json"
+    parquet_path = run_dir / f"{CLUSTERS_STEM}.parquet"
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if parquet is not None and parquet_path.exists():
+            columns = None
+            if fields is not None:
+                available = set(parquet.read_schema(parquet_path).names)
+                columns = [f for f in fields if f in available]
+            return meta, parquet.read_table(parquet_path, columns=columns).to_pylist()
+        jsonl_path = find_jsonl(run_dir, CLUSTERS_STEM)
+        if jsonl_path is not None:
+            return meta, list(iter_jsonl(jsonl_path, fields))
+    json_path = run_dir / f"{CLUSTERS_STEM}.json"
+    if not json_path.exists():
+        raise FileNotFoundError(f"Missing {json_path}")
+    payload = json.loads(json_path.read_text(encoding="utf-8"))
+    clusters = payload.get("clusters", [])
+    if not isinstance(clusters, list):
+        clusters = []
+    return payload.get("meta", {}), [_project(c, fields) for c in clusters]
@@ -1,18 +1,38 @@
 from __future__ import annotations
 
 import argparse
+import cProfile
+import hashlib
 import os
 import time
+from collections import Counter
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse
 
-from .demand_extractor import build_meta_summary, cluster_demands, extract_demand_candidates
-from .social_client import SocialClient
+from .artifacts import ARTIFACT_FORMATS, jsonl_name, write_compact_clusters
+from .cluster_index import CLUSTER_ENGINES
+from .cluster_store import DEFAULT_ACTIVE_DAYS, ClusterStore
+from .demand_extractor import (
+    cluster_demands,
+    extract_demand_candidates,
+    iter_demand_candidates,
+    meta_summary_from_counts,
+)
+from .fetch_engine import FetchEngine, FetchJob
+from .http_cache import ResponseCache
+from .incremental import IncrementalStore
+from .models import DemandCandidate, RedditPost
+from .post_batch import PostBatch
+from .run_metrics import METRICS_NAME, PROFILE_NAME, RunMetrics
+from .social_client import SE_SEARCH_URL, SocialClient
 from .reporting import (
+    JsonlWriter,
     build_demandsolution_seed,
     serialize_candidates,
     serialize_clusters,
-    serialize_posts,
     timestamped_output_dir,
     write_json,
     write_jsonl,
@@ -22,6 +42,12 @@ from .reporting import (
 DEFAULT_SOURCES = "hackernews,stackoverflow"
 DEFAULT_USER_AGENT = "demand-signal-collector/0.1 (contact: jacksuyu@gmail.com)"
 DEFAULT_SEARCH_QUERIES = "need app,looking for tool,wish there was,how do i automate,any software for,struggling with"
+# StackExchange bans IPs above 30 req/s; the host rate limit keeps the actual rate well below that.
+SE_MAX_IN_FLIGHT = 8
+NO_POSTS_MESSAGE = (
+    "No social posts were fetched from Hacker News/StackExchange. "
+    "Check network access and try reducing --per-query-per-source."
+)
 
 
 def parse_args() -> argparse.Namespace:
@@ -29,6 +55,19 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--sources", default=DEFAULT_SOURCES, help="Comma-separated sources: hackernews,stackoverflow")
     parser.add_argument("--per-query-per-source", type=int, default=40, help="Max posts/questions fetched per query per source.")
     parser.add_argument("--stackexchange-site", default="stackoverflow", help="StackExchange site (default: stackoverflow).")
+    parser.add_argument(
+        "--stackexchange-sites",
+        default="",
+        help="Comma-separated StackExchange sites searched concurrently, e.g. stackoverflow,superuser,webapps,softwarerecs "
+        "(overrides --stackexchange-site).",
+    )
+    parser.add_argument(
+        "--stackexchange-concurrency",
+        type=int,
+        default=0,
+        help="Max in-flight StackExchange requests across all sites (default: --per-host-concurrency per site, "
+        f"up to {SE_MAX_IN_FLIGHT}). All sites share one rate limit and daily quota.",
+    )
     parser.add_argument("--hours", type=int, default=168, help="Only include posts newer than this many hours.")
     parser.add_argument("--min-score", type=int, default=2, help="Minimum demand confidence score.")
     parser.add_argument("--similarity-threshold", type=float, default=0.62, help="Fuzzy grouping threshold (0-1).")
@@ -44,6 +83,79 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Include self-promotional founder posts (default excludes them).",
     )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=4,
+        help="Concurrent fetch workers across all (query, source, page) jobs. Use 1 for serial fetching.",
+    )
+    parser.add_argument(
+        "--per-host-concurrency",
+        type=int,
+        default=2,
+        help="Max in-flight requests per API host when fetching concurrently.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("SOCIAL_CACHE_DIR", ""),
+        help="Persistent HTTP response cache directory (default: disabled).",
+    )
+    parser.add_argument("--cache-ttl-hours", type=float, default=6.0, help="Serve cached responses younger than this.")
+    parser.add_argument("--cache-max-mb", type=int, default=256, help="Evict least recently used cache entries above this size.")
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=1,
+        help="Processes for candidate extraction on large post sets (0 = one per CPU, 1 = serial).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream posts from fetch through extraction to raw_posts/demand_candidates JSONL "
+        "instead of holding every post in memory (extraction runs serially).",
+    )
+    parser.add_argument(
+        "--cluster-engine",
+        choices=CLUSTER_ENGINES,
+        default="index",
+        help="Clustering neighbor search: index (default) and scan give identical clusters, the index "
+        "just skips pairs that provably cannot reach the threshold; tfidf uses batched sparse cosine "
+        "similarity instead (needs numpy and scipy, and usually a lower --similarity-threshold).",
+    )
+    parser.add_argument(
+        "--cluster-store",
+        default="",
+        help="SQLite file that keeps clusters across runs so recurring themes keep their IDs (default: disabled).",
+    )
+    parser.add_argument(
+        "--cluster-store-days",
+        type=float,
+        default=DEFAULT_ACTIVE_DAYS,
+        help="Stored clusters without a new mention for this many days are no longer matched and are pruned.",
+    )
+    parser.add_argument(
+        "--incremental-dir",
+        default="",
+        help="Directory for per-query watermarks and the stored post window; only newer posts are fetched (default: disabled).",
+    )
+    parser.add_argument(
+        "--refresh-hn",
+        action="store_true",
+        help="Refresh points and comment counts of stored Hacker News window posts with batched story-ID lookups "
+        "(needs --incremental-dir).",
+    )
+    parser.add_argument(
+        "--artifact-format",
+        choices=ARTIFACT_FORMATS,
+        default="json",
+        help="json: plain JSONL and demand_clusters.json; compact: zstd JSONL plus Parquet clusters with "
+        "requirements-social-extras.txt installed, gzip JSONL without them (smaller, but slower to load than json).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Write a cProfile dump of the main thread to {PROFILE_NAME} in the run directory.",
+    )
     return parser.parse_args()
 
 
@@ -51,85 +163,282 @@ def parse_csv_terms(raw: str) -> List[str]:
     return [s.strip() for s in raw.split(",") if s.strip()]
 
 
+def _fetched_posts(
+    engine: FetchEngine,
+    jobs: Sequence[FetchJob],
+    limit: int,
+    from_date: int,
+    store: Optional[IncrementalStore],
+    fetch_failures: List[str],
+    metrics: RunMetrics,
+) -> Iterator[RedditPost]:
+    # Yields posts job by job as fetches complete; watermarks advance only for successful jobs.
+    for _, result in engine.iter_results(jobs, limit=limit, from_date_utc=from_date):
+        # Same labels the posts carry in their subreddit field.
+        source = f"stackexchange:{result.job.site}" if result.job.site else result.job.source
+        metrics.add_stage(f"fetch.{source}", result.wall_s, result.cpu_s)
+        metrics.add_stage(f"fetch.{source}.{result.job.query}", result.wall_s, result.cpu_s)
+        if store is not None and result.error is None:
+            store.advance(result.job.key, result.posts)
+        if result.error is not None:
+            message = f"Failed {result.job.failure_label}: {result.error}"
+            fetch_failures.append(message)
+            print(f"[WARN] {message}")
+        else:
+            print(f"{result.job.label}: {len(result.posts):>3} posts")
+        yield from result.posts
+
+
+def _unique_posts(posts: Iterable[RedditPost]) -> Iterator[RedditPost]:
+    # 8-byte digests keep the seen-set small; the first copy of a post wins.
+    seen: Set[bytes] = set()
+    for post in posts:
+        digest = hashlib.blake2b(f"{post.subreddit}:{post.id}".encode("utf-8"), digest_size=8).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        yield post
+
+
+def _refresh_hn_window(
+    engine: FetchEngine,
+    store: IncrementalStore,
+    window_cutoff: float,
+    fetch_failures: List[str],
+    metrics: RunMetrics,
+) -> Dict[str, Tuple[int, int]]:
+    with metrics.stage("refresh_hn"):
+        story_ids = [post.id for post in store.iter_window(window_cutoff) if post.subreddit == "hackernews"]
+        result = engine.refresh_hn(story_ids)
+    for exc in result.errors:
+        message = f"Failed HN refresh batch: {exc}"
+        fetch_failures.append(message)
+        print(f"[WARN] {message}")
+    print(
+        f"HN refresh: {len(result.engagement)}/{len(story_ids)} stored stories updated "
+        f"in {result.requests} requests"
+    )
+    return result.engagement
+
+
+def _with_engagement(posts: Iterable[RedditPost], engagement: Dict[str, Tuple[int, int]]) -> Iterator[RedditPost]:
+    for post in posts:
+        current = engagement.get(post.id) if post.subreddit == "hackernews" else None
+        if current is not None:
+            post.score, post.num_comments = current
+        yield post
+
+
+def _run_stream(
+    args: argparse.Namespace,
+    fetched: Iterable[RedditPost],
+    store: Optional[IncrementalStore],
+    window_cutoff: float,
+    engagement: Dict[str, Tuple[int, int]],
+) -> Tuple[Path, Dict[str, int], List[DemandCandidate]]:
+    # Fresh posts come first so they win over stored window copies in the dedup.
+    sources: Iterable[RedditPost] = fetched
+    if store is not None:
+        sources = chain(fetched, _with_engagement(store.iter_window(window_cutoff), engagement))
+    posts = _unique_posts(sources)
+    first = next(posts, None)
+    if first is None:
+        raise RuntimeError(NO_POSTS_MESSAGE)
+
+    out_dir = timestamped_output_dir(Path(args.output_dir))
+    post_counts: Dict[str, int] = Counter()
+    candidates: List[DemandCandidate] = []
+    with ExitStack() as stack:
+        raw_out = stack.enter_context(JsonlWriter(out_dir / jsonl_name("raw_posts", args.artifact_format)))
+        candidates_out = stack.enter_context(
+            JsonlWriter(out_dir / jsonl_name("demand_candidates", args.artifact_format))
+        )
+        add_to_window = stack.enter_context(store.window_writer(window_cutoff)) if store is not None else None
+
+        def tap(stream: Iterable[RedditPost]) -> Iterator[RedditPost]:
+            for post in stream:
+                raw_out.write(post.to_dict())
+                post_counts[post.subreddit] += 1
+                if add_to_window is not None:
+                    add_to_window(post)
+                yield post
+
+        for candidate in iter_demand_candidates(
+            tap(chain([first], posts)),
+            max_age_hours=args.hours,
+            min_score=args.min_score,
+            exclude_self_promo=not args.include_self_promo,
+        ):
+            candidates_out.write(candidate.to_dict())
+            candidates.append(candidate)
+    if store is not None:
+        store.save_watermarks()
+    return out_dir, post_counts, candidates
+
+
 def main() -> None:
     args = parse_args()
+    metrics = RunMetrics()
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
     sources = {s.lower() for s in parse_csv_terms(args.sources)}
     if not sources:
         raise ValueError("At least one source is required.")
     if not {"hackernews", "stackoverflow"} & sources:
         raise ValueError("Supported sources are: hackernews, stackoverflow")
 
-    client = SocialClient(user_agent=args.user_agent)
+    cache = None
+    if args.cache_dir:
+        cache = ResponseCache(
+            Path(args.cache_dir),
+            ttl_s=args.cache_ttl_hours * 3600,
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+        )
+    client = SocialClient(user_agent=args.user_agent, cache=cache, metrics=metrics)
     search_queries = parse_csv_terms(args.search_queries)
-    all_posts = []
-    fetch_failures = []
     from_date = int(time.time()) - (args.hours * 3600)
+    # Floor to the hour so request params (and cache keys) stay stable across re-runs;
+    # extract_demand_candidates still applies the exact --hours cutoff.
+    from_date -= from_date % 3600
+    window_cutoff = time.time() - args.hours * 3600
+
+    store = IncrementalStore(Path(args.incremental_dir)) if args.incremental_dir else None
+    if args.refresh_hn and store is None:
+        raise ValueError("--refresh-hn needs --incremental-dir.")
 
+    se_sites = list(dict.fromkeys(parse_csv_terms(args.stackexchange_sites.lower()))) or [args.stackexchange_site]
+    jobs: List[FetchJob] = []
     for query in search_queries:
         if "hackernews" in sources:
-            try:
-                hn_posts = client.fetch_hn_search(query=query, limit=args.per_query_per_source)
-                all_posts.extend(hn_posts)
-                print(f"HN query '{query}': {len(hn_posts):>3} posts")
-            except Exception as exc:
-                message = f"Failed HN query='{query}': {exc}"
-                fetch_failures.append(message)
-                print(f"[WARN] {message}")
-
+            jobs.append(FetchJob(source="hackernews", query=query))
         if "stackoverflow" in sources:
-            try:
-                se_posts = client.fetch_stackexchange_search(
-                    query=query,
-                    site=args.stackexchange_site,
-                    limit=args.per_query_per_source,
-                    from_date_utc=from_date,
-                )
-                all_posts.extend(se_posts)
-                print(f"SE({args.stackexchange_site}) query '{query}': {len(se_posts):>3} posts")
-            except Exception as exc:
-                message = f"Failed StackExchange query='{query}': {exc}"
-                fetch_failures.append(message)
-                print(f"[WARN] {message}")
-
-    if not all_posts:
-        raise RuntimeError(
-            "No social posts were fetched from Hacker News/StackExchange. "
-            "Check network access and try reducing --per-query-per-source."
-        )
+            # One job per site: /search/advanced takes a single site and no OR across query terms.
+            jobs.extend(FetchJob(source="stackoverflow", query=query, site=site) for site in se_sites)
+    if store is not None:
+        for job in jobs:
+            watermark = store.watermark(job.key)
+            if watermark is not None:
+                job.since_utc = watermark.created_utc
+                job.known_ids = frozenset(watermark.post_ids)
+
+    se_in_flight = args.stackexchange_concurrency or min(SE_MAX_IN_FLIGHT, args.per_host_concurrency * len(se_sites))
+    workers = args.fetch_workers
+    if workers > 1 and "stackoverflow" in sources:
+        # Enough workers that extra sites overlap instead of queueing behind the default pool.
+        workers = max(workers, se_in_flight + (args.per_host_concurrency if "hackernews" in sources else 0))
+    engine = FetchEngine(
+        client,
+        workers=workers,
+        per_host_limit=args.per_host_concurrency,
+        host_limits={urlparse(SE_SEARCH_URL).netloc: se_in_flight},
+    )
+    fetch_failures: List[str] = []
+    engagement: Dict[str, Tuple[int, int]] = {}
+    if args.refresh_hn and store is not None:
+        engagement = _refresh_hn_window(engine, store, window_cutoff, fetch_failures, metrics)
+    fetched = _fetched_posts(engine, jobs, args.per_query_per_source, from_date, store, fetch_failures, metrics)
+
+    if args.stream:
+        # Fetching, extraction and the JSONL writers interleave here, so they share one stage.
+        with metrics.stage("stream"):
+            out_dir, post_counts, candidates = _run_stream(args, fetched, store, window_cutoff, engagement)
+    else:
+        all_posts: List[RedditPost] = []
+        if store is not None:
+            with metrics.stage("load_window"):
+                window_posts = list(_with_engagement(store.iter_window(window_cutoff), engagement))
+            all_posts.extend(window_posts)
+            print(f"Incremental: {len(window_posts)} stored posts still inside the {args.hours}h window")
+        with metrics.stage("fetch"):
+            all_posts.extend(fetched)
+        if not all_posts:
+            raise RuntimeError(NO_POSTS_MESSAGE)
 
-    # Deduplicate by source + post ID
-    dedup = {}
-    for post in all_posts:
-        dedup[f"{post.subreddit}:{post.id}"] = post
-    posts = list(dedup.values())
+        with metrics.stage("dedup"):
+            # Deduplicate by source + post ID (freshly fetched posts replace stored window copies)
+            dedup = {}
+            for post in all_posts:
+                dedup[f"{post.subreddit}:{post.id}"] = post
+            posts = PostBatch.from_posts(dedup.values())
+            # The batch now owns the rows; drop the per-post objects before extraction and clustering.
+            del all_posts, dedup
+        if store is not None:
+            with metrics.stage("save_window"):
+                store.save(posts, cutoff_utc=window_cutoff)
 
-    candidates = extract_demand_candidates(
-        posts=posts,
-        max_age_hours=args.hours,
-        min_score=args.min_score,
-        exclude_self_promo=not args.include_self_promo,
+        with metrics.stage("extract_demand_candidates"):
+            candidates = extract_demand_candidates(
+                posts=posts,
+                max_age_hours=args.hours,
+                min_score=args.min_score,
+                exclude_self_promo=not args.include_self_promo,
+                workers=args.extract_workers,
+            )
+        post_counts = posts.source_counts()
+        out_dir = timestamped_output_dir(Path(args.output_dir))
+        with metrics.stage("write.raw_posts"):
+            write_jsonl(out_dir / jsonl_name("raw_posts", args.artifact_format), posts.iter_dicts())
+        with metrics.stage("write.demand_candidates"):
+            write_jsonl(
+                out_dir / jsonl_name("demand_candidates", args.artifact_format), serialize_candidates(candidates)
+            )
+
+    cluster_store = (
+        ClusterStore(Path(args.cluster_store), active_days=args.cluster_store_days) if args.cluster_store else None
     )
-    clusters = cluster_demands(candidates=candidates, threshold=args.similarity_threshold)
-    meta = build_meta_summary(posts=posts, candidates=candidates, clusters=clusters)
+    pruned_clusters = 0
+    try:
+        with metrics.stage("cluster_demands"):
+            clusters = cluster_demands(
+                candidates=candidates,
+                threshold=args.similarity_threshold,
+                engine=args.cluster_engine,
+                store=cluster_store,
+            )
+        if cluster_store is not None:
+            pruned_clusters = cluster_store.prune()
+    finally:
+        if cluster_store is not None:
+            cluster_store.close()
+    with metrics.stage("build_meta_summary"):
+        meta = meta_summary_from_counts(post_counts, total_candidates=len(candidates), total_clusters=len(clusters))
 
-    out_dir = timestamped_output_dir(Path(args.output_dir))
-    write_jsonl(out_dir / "raw_posts.jsonl", serialize_posts(posts))
-    write_jsonl(out_dir / "demand_candidates.jsonl", serialize_candidates(candidates))
-    write_json(
-        out_dir / "demand_clusters.json",
-        {
-            "meta": meta,
-            "clusters": serialize_clusters(clusters),
-        },
-    )
-    write_json(out_dir / "demandsolution_seed_ideas.json", build_demandsolution_seed(clusters, source_name="social"))
-    write_markdown_report(out_dir / "report.md", meta=meta, clusters=clusters)
+    with metrics.stage("write.demand_clusters"):
+        if args.artifact_format == "compact":
+            write_compact_clusters(out_dir, meta, serialize_clusters(clusters))
+        else:
+            write_json(
+                out_dir / "demand_clusters.json",
+                {
+                    "meta": meta,
+                    "clusters": serialize_clusters(clusters),
+                },
+            )
+    with metrics.stage("write.seed_ideas"):
+        write_json(out_dir / "demandsolution_seed_ideas.json", build_demandsolution_seed(clusters, source_name="social"))
+    with metrics.stage("write.report"):
+        write_markdown_report(out_dir / "report.md", meta=meta, clusters=clusters)
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(str(out_dir / PROFILE_NAME))
+    metrics.write(out_dir / METRICS_NAME)
 
     print("")
     print(f"Saved outputs to: {out_dir}")
     print(f"Total posts: {meta['total_posts']}")
     print(f"Demand candidates: {meta['total_candidates']}")
     print(f"Demand clusters: {meta['total_clusters']}")
+    if cluster_store is not None:
+        print(f"Cluster store: pruned {pruned_clusters} clusters inactive for {args.cluster_store_days:g}+ days")
+    if cache is not None:
+        print(
+            "HTTP cache: "
+            f"{cache.stats['hits']} hits, {cache.stats['revalidated']} revalidated, {cache.stats['misses']} misses"
+        )
+    print(f"Run metrics: {out_dir / METRICS_NAME}")
+    if profiler is not None:
+        print(f"Profile: {out_dir / PROFILE_NAME}")
     if fetch_failures:
         print(f"Warnings: {len(fetch_failures)} fetch calls failed but pipeline continued.")
 
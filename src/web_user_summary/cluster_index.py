@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
+
+# Optional: only the "tfidf" engine needs them.
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+_SUFFIXES = ("ations", "ation", "ments", "ment", "ings", "ing", "ions", "ion", "ers", "er", "ies", "es", "ed", "ly", "s")
+
+
+def _stem(token: str) -> str:
+    # Crude suffix stripping, so inflections share a tfidf feature.
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[: -len(suffix)]
+            break
+    if len(token) > 3 and token[-1] in "ey":
+        token = token[:-1]
+    return token
+
+
+def similarity(a: str, b: str) -> float:
+    seq = SequenceMatcher(a=a, b=b).ratio()
+    a_set = set(a.split())
+    b_set = set(b.split())
+    if not a_set or not b_set:
+        return seq
+    inter = len(a_set & b_set)
+    union = len(a_set | b_set)
+    jaccard = inter / union if union else 0.0
+    return max(seq, jaccard)
+
+
+class ScanMatcher:
+    # Reference implementation: exact similarity against every anchor.
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self.anchors: List[str] = []
+
+    def add(self, normalized: str) -> int:
+        self.anchors.append(normalized)
+        return len(self.anchors) - 1
+
+    def best_match(self, normalized: str) -> Tuple[int, float]:
+        best_idx = -1
+        best_sim = 0.0
+        for idx, anchor in enumerate(self.anchors):
+            sim = similarity(normalized, anchor)
+            if sim > best_sim:
+                best_sim = sim
+                best_idx = idx
+        return best_idx, best_sim
+
+
+# Fixed-point scale for the in-block threshold test.
+_SCALE_BITS = 10
+
+
+def _repeat(pattern: int, period: int, total_bits: int) -> int:
+    # `pattern` copied every `period` bits; total_bits is a multiple of period.
+    return pattern * (((1 << total_bits) - 1) // ((1 << period) - 1))
+
+
+@lru_cache(maxsize=None)
+def _swar_masks(width: int, capacity: int) -> Tuple[Tuple[int, ...], Tuple[Tuple[int, int], ...], int, int]:
+    # Masks for a SWAR popcount into `width`-bit fields, plus each field's top bit and lowest bit.
+    bits = width * capacity
+    pairs = tuple(_repeat((1 << f) - 1, 2 * f, bits) for f in (1, 2, 4))
+    sums = []
+    field = 8
+    while field < width:
+        sums.append((field, _repeat((1 << field) - 1, 2 * field, bits)))
+        field *= 2
+    return pairs, tuple(sums), _repeat(1 << (width - 1), width, bits), _repeat(1, width, bits)
+
+
+# Bit-parallel LCS (Hyyrö 2004) for a block of anchors packed into one integer, one fixed-width
+# field per anchor. Per probe character the row update is
+#     match = row & mask[ch];  row = ((row + match) | (row - match)) & ones
+# and a carry out of an anchor's bits only reaches unused bits of its field, which `& ones` clears,
+# so each field holds exactly the row of running the algorithm on that anchor alone. The LCS is the
+# number of zero bits in the anchor's part of the row; it is counted for all fields at once with a
+# SWAR popcount, and compared against the threshold with a SWAR subtraction, so Python only
+# touches anchors that can reach it.
+class _LcsBlock:
+    def __init__(self, width: int, capacity: int, threshold: float) -> None:
+        self.width = width
+        self.threshold = threshold
+        self.idxs: List[int] = []
+        self.lengths: List[int] = []
+        self.masks: Dict[str, int] = {}
+        self.ones = 0
+        # Per field: width * 2**_SCALE_BITS - floor(t * len * 2**_SCALE_BITS), keeping the test non-negative.
+        self.bias = 0
+        self.capacity = capacity
+        self._pairs, self._sums, self._high, self._unit = _swar_masks(width, capacity)
+
+    def full(self) -> bool:
+        return len(self.idxs) >= self.capacity
+
+    def add(self, idx: int, text: str) -> None:
+        base = len(self.idxs) * self.width
+        for pos, ch in enumerate(text):
+            self.masks[ch] = self.masks.get(ch, 0) | (1 << (base + pos))
+        self.ones |= ((1 << len(text)) - 1) << base
+        scale = 1 << _SCALE_BITS
+        self.bias |= (self.width * scale - math.floor(self.threshold * len(text) * scale)) << base
+        self.idxs.append(idx)
+        self.lengths.append(len(text))
+
+    def candidates(self, text: str) -> Iterable[Tuple[int, int, int]]:
+        # (anchor index, anchor length, LCS) for anchors with 2 * LCS >= t * (len(text) + len(anchor)),
+        # give or take one fixed-point unit in favour of keeping them.
+        row = ones = self.ones
+        masks = self.masks
+        for ch in text:
+            match = row & masks.get(ch, 0)
+            row = ((row + match) | (row - match)) & ones
+        m1, m2, m4 = self._pairs
+        count = ones ^ row
+        count -= (count >> 1) & m1
+        count = (count & m2) + ((count >> 2) & m2)
+        count = (count + (count >> 4)) & m4
+        for field, mask in self._sums:
+            count = (count + (count >> field)) & mask
+
+        scale = 1 << _SCALE_BITS
+        cutoff = self.width * scale + math.floor(self.threshold * len(text) * scale) - 1
+        passed = (((count << (_SCALE_BITS + 1)) + self.bias) | self._high) - cutoff * self._unit
+        passed &= self._high
+        width = self.width
+        while passed:
+            low = passed & -passed
+            slot = low.bit_length() // width - 1
+            passed ^= low
+            yield self.idxs[slot], self.lengths[slot], (count >> (slot * width)) & ((1 << width) - 1)
+
+
+# Exact index for `similarity` >= threshold: returns the same match as ScanMatcher whenever the
+# scan's best anchor reaches the threshold.
+#
+# Jaccard: tokens are ordered rarest-first across the whole candidate set, and each anchor is
+# indexed, and each probe looks up, only its first n - ceil(t * n) + 1 tokens. Two sets with
+# Jaccard >= t overlap in at least ceil(t * n) tokens of either side, so their rarest shared token
+# lies in both prefixes and the pair is always found.
+# SequenceMatcher: its matching blocks form a common subsequence, so its ratio never exceeds
+# 2 * LCS / (len(a) + len(b)). _LcsBlock computes that LCS against a whole block of anchors per
+# big-int pass, and it is usually within a few percent of the real ratio.
+#
+# Anchors are then scored best bound first, and the exact SequenceMatcher runs only while a bound
+# can still beat the best score so far.
+class AnchorIndex:
+    def __init__(self, threshold: float, corpus: Iterable[str] = (), block_size: int = 1024) -> None:
+        self.threshold = threshold
+        self.block_size = max(1, block_size)
+        self.anchors: List[str] = []
+        self._anchor_tokens: List[FrozenSet[str]] = []
+        # Anchors go to blocks by field width (the next power of two above their length, at least
+        # 64), so short anchors do not pay for long ones.
+        self._blocks: List[_LcsBlock] = []
+        self._open_blocks: Dict[int, _LcsBlock] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._token_rank: Dict[str, int] = {}
+        self.stats = {"probes": 0, "candidates": 0, "exact_scored": 0}
+
+        doc_freq: Counter = Counter()
+        for text in corpus:
+            doc_freq.update(set(text.split()))
+        for rank, (token, _) in enumerate(sorted(doc_freq.items(), key=lambda x: (x[1], x[0]))):
+            self._token_rank[token] = rank
+
+    def _prefix(self, tokens: FrozenSet[str]) -> List[str]:
+        unseen = len(self._token_rank)
+        ordered = sorted(tokens, key=lambda t: (self._token_rank.get(t, unseen), t))
+        # The epsilon keeps float noise in t * n from rounding the overlap up and dropping a pair.
+        return ordered[: len(ordered) - math.ceil(self.threshold * len(ordered) - 1e-9) + 1]
+
+    def add(self, normalized: str) -> int:
+        idx = len(self.anchors)
+        tokens = frozenset(normalized.split())
+        self.anchors.append(normalized)
+        self._anchor_tokens.append(tokens)
+        width = max(64, 1 << len(normalized).bit_length())
+        block = self._open_blocks.get(width)
+        if block is None or block.full():
+            block = _LcsBlock(width, self.block_size, self.threshold)
+            self._open_blocks[width] = block
+            self._blocks.append(block)
+        block.add(idx, normalized)
+        for token in self._prefix(tokens):
+            self._postings.setdefault(token, []).append(idx)
+        return idx
+
+    def best_match(self, normalized: str) -> Tuple[int, float]:
+        self.stats["probes"] += 1
+        tokens = frozenset(normalized.split())
+        length = len(normalized)
+        threshold = self.threshold
+
+        # Upper bound on the SequenceMatcher ratio for every anchor that could reach the threshold.
+        seq_bounds: Dict[int, float] = {}
+        for block in self._blocks:
+            for idx, anchor_length, lcs in block.candidates(normalized):
+                total = length + anchor_length
+                bound = 2.0 * lcs / total if total else 1.0
+                if bound >= threshold:
+                    seq_bounds[idx] = bound
+        jaccards: Dict[int, float] = {}
+        for token in self._prefix(tokens):
+            for idx in self._postings.get(token, ()):
+                if idx not in jaccards:
+                    anchor_tokens = self._anchor_tokens[idx]
+                    jaccards[idx] = len(tokens & anchor_tokens) / len(tokens | anchor_tokens)
+
+        candidates = sorted(
+            (-max(seq_bounds.get(idx, 0.0), jaccards.get(idx, 0.0)), idx) for idx in seq_bounds.keys() | jaccards.keys()
+        )
+        # Only anchors at or above the threshold matter; among equal scores the lowest index wins,
+        # as in the scan.
+        best_idx = -1
+        best_sim = threshold
+        for neg_bound, idx in candidates:
+            if -neg_bound < best_sim:
+                break
+            self.stats["candidates"] += 1
+            sim = jaccards.get(idx, 0.0)
+            if seq_bounds.get(idx, 0.0) > sim and seq_bounds[idx] >= best_sim:
+                self.stats["exact_scored"] += 1
+                sim = max(sim, SequenceMatcher(a=normalized, b=self.anchors[idx]).ratio())
+            if sim > best_sim or (sim == best_sim and (best_idx < 0 or idx < best_idx)):
+                best_sim = sim
+                best_idx = idx
+        if best_idx < 0:
+            return -1, 0.0
+        return best_idx, best_sim
+
+
+def _features(text: str) -> Set[str]:
+    tokens = text.split()
+    return set(tokens) | {"~" + _stem(t) for t in tokens}
+
+
+# Greedy clustering on cosine similarity of L2-normalised TF-IDF vectors over tokens and their stems.
+#
+# Candidates are scored a block at a time with one sparse product against every anchor that existed
+# when the block started; anchors created inside the block are scored from the block's own Gram
+# matrix. The greedy assignment is therefore the same as scoring one candidate at a time, but the
+# scores are cosines rather than max(SequenceMatcher, Jaccard), so thresholds do not carry over
+# one-to-one from the other engines.
+class VectorMatcher:
+    def __init__(self, threshold: float, corpus: Iterable[str] = (), block_size: int = 256) -> None:
+        if np is None or sparse is None:
+            raise RuntimeError("The tfidf cluster engine needs numpy and scipy. Install them with: pip install numpy scipy")
+        self.threshold = threshold
+        self.block_size = max(1, block_size)
+        self.anchors: List[str] = []
+        self._anchor_rows: List[int] = []
+        self._rows: Dict[str, int] = {}
+        self.stats = {"probes": 0, "blocks": 0}
+
+        feature_sets: List[Set[str]] = []
+        doc_freq: Counter = Counter()
+        for text in corpus:
+            if text not in self._rows:
+                self._rows[text] = len(feature_sets)
+                feature_sets.append(_features(text))
+                doc_freq.update(feature_sets[-1])
+        self._vocab = {feature: col for col, feature in enumerate(doc_freq)}
+        df = np.fromiter(doc_freq.values(), dtype=np.float64, count=len(doc_freq))
+        self._idf = np.log((1.0 + len(feature_sets)) / (1.0 + df)) + 1.0
+        self._vectors = self._vectorize(feature_sets)
+
+        # Current block: corpus rows [start, end), their scores against the first `snapshot` anchors,
+        # and anchors added since, split into rows inside the block and (rarely) outside it.
+        self._block_start = 0
+        self._block_end = 0
+        self._block_scores = None
+        self._block_gram = None
+        self._snapshot = 0
+        self._new_in_block: List[Tuple[int, int]] = []
+        self._new_elsewhere: List[int] = []
+
+    def _vectorize(self, feature_sets: Sequence[Set[str]]):
+        indptr = [0]
+        indices: List[int] = []
+        for features in feature_sets:
+            indices.extend(sorted(self._vocab[f] for f in features if f in self._vocab))
+            indptr.append(len(indices))
+        cols = np.asarray(indices, dtype=np.int32)
+        rows = np.repeat(np.arange(len(feature_sets)), np.diff(indptr))
+        data = self._idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(feature_sets)))
+        data = data / norms[rows]
+        return sparse.csr_matrix(
+            (data, cols, np.asarray(indptr, dtype=np.int64)), shape=(len(feature_sets), len(self._vocab))
+        )
+
+    def _row(self, normalized: str) -> int:
+        row = self._rows.get(normalized)
+        if row is None:
+            # Not part of the corpus: vectorised against the corpus vocabulary and IDF.
+            row = self._vectors.shape[0]
+            self._vectors = sparse.vstack([self._vectors, self._vectorize([_features(normalized)])], format="csr")
+            self._rows[normalized] = row
+        return row
+
+    def add(self, normalized: str) -> int:
+        idx = len(self.anchors)
+        row = self._row(normalized)
+        self.anchors.append(normalized)
+        self._anchor_rows.append(row)
+        if self._block_scores is not None:
+            if self._block_start <= row < self._block_end:
+                self._new_in_block.append((idx, row - self._block_start))
+            else:
+                self._new_elsewhere.append(idx)
+        return idx
+
+    def _score_block(self, start: int) -> None:
+        self.stats["blocks"] += 1
+        end = min(start + self.block_size, self._vectors.shape[0])
+        block = self._vectors[start:end]
+        scores = block @ self._vectors[self._anchor_rows].T
+        gram = block @ block.T
+        # Sorted columns make argmax pick the lowest anchor index on ties, like the scan.
+        scores.sort_indices()
+        gram.sort_indices()
+        self._block_start, self._block_end = start, end
+        self._block_scores, self._block_gram = scores, gram
+        self._snapshot = len(self._anchor_rows)
+        self._new_in_block = []
+        self._new_elsewhere = []
+
+    @staticmethod
+    def _dense_row(matrix, local: int, width: int):
+        out = np.zeros(width)
+        lo, hi = matrix.indptr[local], matrix.indptr[local + 1]
+        out[matrix.indices[lo:hi]] = matrix.data[lo:hi]
+        return out
+
+    def _scores(self, row: int):
+        if row < self._block_start:
+            # A repeated text from before the current block: score it directly.
+            return (self._vectors[row] @ self._vectors[self._anchor_rows].T).toarray().ravel()
+        if row >= self._block_end:
+            self._score_block(row)
+        local = row - self._block_start
+        scores = self._dense_row(self._block_scores, local, self._snapshot)
+        extra = len(self._anchor_rows) - self._snapshot
+        if not extra:
+            return scores
+        added = np.zeros(extra)
+        if self._new_in_block:
+            gram_row = self._dense_row(self._block_gram, local, self._block_end - self._block_start)
+            positions, locals_ = zip(*self._new_in_block)
+            added[np.asarray(positions) - self._snapshot] = gram_row[list(locals_)]
+        for idx in self._new_elsewhere:
+            added[idx - self._snapshot] = self._vectors[row].multiply(self._vectors[self._anchor_rows[idx]]).sum()
+        return np.concatenate([scores, added])
+
+    def best_match(self, normalized: str) -> Tuple[int, float]:
+        self.stats["probes"] += 1
+        row = self._row(normalized)
+        if not self._anchor_rows:
+            return -1, 0.0
+        scores = self._scores(row)
+        best_idx = int(scores.argmax())
+        best_sim = float(scores[best_idx])
+        if best_sim <= 0.0:
+            return -1, 0.0
+        return best_idx, best_sim
+
+
+CLUSTER_ENGINES = ("scan", "index", "tfidf")
+
+
+def build_matcher(engine: str, threshold: float, corpus: Sequence[str]):
+    if engine not in CLUSTER_ENGINES:
+        raise ValueError(f"Unknown cluster engine: {engine}")
+    if engine == "tfidf":
+        return VectorMatcher(threshold, corpus=corpus)
+    if engine == "scan" or not 0 < threshold <= 1:
+        return ScanMatcher(threshold)
+    return AnchorIndex(threshold, corpus=corpus)
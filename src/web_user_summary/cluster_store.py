@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .models import DemandCandidate
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clusters (
+    seq INTEGER PRIMARY KEY,
+    cluster_id TEXT NOT NULL UNIQUE,
+    summary_demand TEXT NOT NULL,
+    normalized_anchor TEXT NOT NULL,
+    demand_count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    urgency_sum REAL NOT NULL DEFAULT 0,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cluster_keywords (
+    cluster_id TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (cluster_id, keyword)
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    candidate_key TEXT PRIMARY KEY,
+    cluster_id TEXT NOT NULL,
+    assigned_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clusters_last_seen ON clusters (last_seen);
+CREATE INDEX IF NOT EXISTS assignments_cluster ON assignments (cluster_id);
+"""
+
+# Clusters without a new mention for this long stop being matched against and are pruned.
+DEFAULT_ACTIVE_DAYS = 30.0
+
+
+@dataclass
+class StoredCluster:
+    seq: int
+    cluster_id: str
+    summary_demand: str
+    normalized_anchor: str
+
+
+@dataclass
+class ClusterHistory:
+    demand_count: int
+    first_seen: float
+    keywords: List[str]
+
+
+def candidate_key(candidate: DemandCandidate) -> str:
+    return f"{candidate.subreddit}:{candidate.post_id}"
+
+
+def cluster_id_for(seq: int) -> str:
+    return f"demand_{seq:03d}"
+
+
+class ClusterStore:
+    def __init__(self, path: Path, active_days: float = DEFAULT_ACTIVE_DAYS) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.active_s = active_days * 86400
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.active_s
+
+    def load_anchors(self) -> List[StoredCluster]:
+        # Only active clusters are matched against, so the anchor set tracks recent themes, not all history.
+        rows = self.conn.execute(
+            "SELECT seq, cluster_id, summary_demand, normalized_anchor FROM clusters WHERE last_seen >= ? ORDER BY seq",
+            (self._cutoff(),),
+        ).fetchall()
+        return [StoredCluster(seq=r[0], cluster_id=r[1], summary_demand=r[2], normalized_anchor=r[3]) for r in rows]
+
+    def next_seq(self) -> int:
+        # The high-water mark outlives pruning, so a pruned cluster's ID is never handed out again.
+        row = self.conn.execute(
+            "SELECT MAX(COALESCE((SELECT MAX(seq) FROM clusters), 0), "
+            "COALESCE((SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'max_seq'), 0))"
+        ).fetchone()
+        return int(row[0]) + 1
+
+    def history(self, cluster_ids: Iterable[str], top_keywords: int = 8) -> Dict[str, ClusterHistory]:
+        # Cumulative mentions, first sighting and keywords across every run that fed the store.
+        out: Dict[str, ClusterHistory] = {}
+        ids = list(cluster_ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            for cid, count, first_seen in self.conn.execute(
+                f"SELECT cluster_id, demand_count, first_seen FROM clusters WHERE cluster_id IN ({placeholders})",
+                chunk,
+            ):
+                out[cid] = ClusterHistory(demand_count=int(count), first_seen=float(first_seen), keywords=[])
+            for cid, keyword in self.conn.execute(
+                f"SELECT cluster_id, keyword FROM cluster_keywords WHERE cluster_id IN ({placeholders}) "
+                "ORDER BY cluster_id, count DESC, keyword",
+                chunk,
+            ):
+                keywords = out[cid].keywords
+                if len(keywords) < top_keywords:
+                    keywords.append(keyword)
+        return out
+
+    def prune(self) -> int:
+        # Drops clusters that fell out of the active window, with their keywords and assignments.
+        cutoff = self._cutoff()
+        with self.conn:
+            stale = "SELECT cluster_id FROM clusters WHERE last_seen < ?"
+            self.conn.execute(f"DELETE FROM cluster_keywords WHERE cluster_id IN ({stale})", (cutoff,))
+            self.conn.execute(
+                f"DELETE FROM assignments WHERE assigned_at < ? OR cluster_id IN ({stale})", (cutoff, cutoff)
+            )
+            cursor = self.conn.execute("DELETE FROM clusters WHERE last_seen < ?", (cutoff,))
+        return cursor.rowcount
+
+    def prior_assignments(self, keys: Iterable[str]) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = self.conn.execute(
+                f"SELECT candidate_key, cluster_id FROM assignments WHERE candidate_key IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            out.update({r[0]: r[1] for r in rows})
+        return out
+
+    def apply(
+        self,
+        new_clusters: Sequence[StoredCluster],
+        new_assignments: Sequence[Tuple[str, DemandCandidate]],
+    ) -> None:
+        now = time.time()
+        counts: Dict[str, List[float]] = {}
+        keywords: Dict[str, Counter] = {}
+        for cluster_id, candidate in new_assignments:
+            totals = counts.setdefault(cluster_id, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += candidate.confidence_score
+            totals[2] += candidate.urgency_score
+            keywords.setdefault(cluster_id, Counter()).update(candidate.keyword_tokens)
+
+        with self.conn:
+            if new_clusters:
+                self.conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('max_seq', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))",
+                    (str(max(c.seq for c in new_clusters)),),
+                )
+            self.conn.executemany(
+                "INSERT INTO clusters (seq, cluster_id, summary_demand, normalized_anchor, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(c.seq, c.cluster_id, c.summary_demand, c.normalized_anchor, now, now) for c in new_clusters],
+            )
+            self.conn.executemany(
+                "UPDATE clusters SET demand_count = demand_count + ?, confidence_sum = confidence_sum + ?, "
+                "urgency_sum = urgency_sum + ?, last_seen = ? WHERE cluster_id = ?",
+                [(int(t[0]), t[1], t[2], now, cid) for cid, t in counts.items()],
+            )
+            self.conn.executemany(
+                "INSERT INTO cluster_keywords (cluster_id, keyword, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(cluster_id, keyword) DO UPDATE SET count = count + excluded.count",
+                [(cid, word, n) for cid, counter in keywords.items() for word, n in counter.items()],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO assignments (candidate_key, cluster_id, assigned_at) VALUES (?, ?, ?)",
+                [(candidate_key(c), cid, now) for cid, c in new_assignments],
+            )
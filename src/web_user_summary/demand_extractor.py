@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import math
+import os
 import re
 import time
 from collections import Counter, defaultdict
-from difflib import SequenceMatcher
-from typing import Dict, List, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
+from .cluster_index import build_matcher
+from .cluster_store import ClusterHistory, ClusterStore, StoredCluster, candidate_key, cluster_id_for
 from .models import DemandCandidate, DemandCluster, RedditPost
+from .pattern_matcher import PatternMatcher
+from .post_batch import PostBatch
 
 DEMAND_PATTERNS = [
     r"\bi need\b",
@@ -80,6 +87,24 @@ URGENCY_PATTERNS = [
     r"\bblocked\b",
 ]
 
+FIRST_PERSON_PATTERNS = [r"\bi\b", r"\bwe\b"]
+
+WANT_VERB_PATTERNS = [r"\bneed\b", r"\bwish\b", r"\bwant\b", r"\blooking\b"]
+
+# Each text is scanned once for every family it is scored against.
+POST_MATCHER = PatternMatcher(
+    {
+        "demand": DEMAND_PATTERNS,
+        "exclude": EXCLUDE_PATTERNS,
+        "self_promo": SELF_PROMO_PATTERNS,
+        "urgency": URGENCY_PATTERNS,
+        "first_person": FIRST_PERSON_PATTERNS,
+        "want_verb": WANT_VERB_PATTERNS,
+    }
+)
+INTENT_MATCHER = PatternMatcher({"ask_intent": ASK_INTENT_PATTERNS, "product_intent": PRODUCT_INTENT_PATTERNS})
+DEMAND_MATCHER = PatternMatcher({"demand": DEMAND_PATTERNS})
+
 STOP_WORDS = {
     "a",
     "an",
@@ -143,34 +168,23 @@ def _keyword_tokens(text: str, max_tokens: int = 8) -> List[str]:
     return [w for w, _ in counts.most_common(max_tokens)]
 
 
-def _pattern_hits(text: str, patterns: Sequence[str]) -> int:
-    return sum(1 for pattern in patterns if re.search(pattern, text, flags=re.IGNORECASE))
-
-
-def _confidence_score(title: str, body: str) -> int:
-    combined = f"{title} {body}".strip()
-    score = _pattern_hits(combined, DEMAND_PATTERNS)
+def _confidence_score(combined: str, hits: Dict[str, int]) -> int:
+    score = hits["demand"]
     if "?" in combined:
         score += 1
-    if re.search(r"\b(i|we)\b", combined, flags=re.IGNORECASE) and re.search(
-        r"\b(need|wish|want|looking)\b", combined, flags=re.IGNORECASE
-    ):
+    if hits["first_person"] and hits["want_verb"]:
         score += 1
     if len(combined) > 220:
         score += 1
     return score
 
 
-def _urgency_score(title: str, body: str) -> int:
-    return _pattern_hits(f"{title} {body}", URGENCY_PATTERNS)
-
-
 def _extract_best_demand_sentence(title: str, body: str) -> str:
     sentences = _split_sentences(f"{title}. {body}".strip())
     if not sentences:
         return _compact_text(title)
     for sentence in sentences:
-        if _pattern_hits(sentence, DEMAND_PATTERNS) > 0:
+        if DEMAND_MATCHER.hits(sentence)["demand"] > 0:
             return sentence
     return sentences[0]
 
@@ -182,28 +196,33 @@ def _shorten(text: str, max_len: int = 170) -> str:
     return txt[: max_len - 3].rstrip() + "..."
 
 
-def extract_demand_candidates(
-    posts: Sequence[RedditPost], max_age_hours: int, min_score: int, exclude_self_promo: bool = True
-) -> List[DemandCandidate]:
-    now = time.time()
-    cutoff = now - max_age_hours * 3600
-    out: List[DemandCandidate] = []
+# Below this many posts a process pool costs more (spawn + pickling) than it saves.
+PARALLEL_EXTRACT_MIN_POSTS = 5000
 
+
+def _iter_candidates(
+    posts: Iterable[RedditPost], cutoff: float, min_score: int, exclude_self_promo: bool
+) -> Iterator[DemandCandidate]:
+    if isinstance(posts, PostBatch):
+        posts = posts.iter_since(cutoff)
     for post in posts:
         if post.created_utc < cutoff:
             continue
-        if _pattern_hits(f"{post.title} {post.selftext}", EXCLUDE_PATTERNS) > 0:
+        combined = f"{post.title} {post.selftext}"
+        hits = POST_MATCHER.hits(combined)
+        if hits["exclude"] > 0:
             continue
-        if exclude_self_promo and _pattern_hits(f"{post.title} {post.selftext}", SELF_PROMO_PATTERNS) > 0:
+        if exclude_self_promo and hits["self_promo"] > 0:
             continue
-        confidence = _confidence_score(post.title, post.selftext)
+        confidence = _confidence_score(combined.strip(), hits)
         if confidence < min_score:
             continue
 
         demand_text = _extract_best_demand_sentence(post.title, post.selftext)
-        if _pattern_hits(f"{post.title} {demand_text}", ASK_INTENT_PATTERNS) == 0:
+        intent = INTENT_MATCHER.hits(f"{post.title} {demand_text}")
+        if intent["ask_intent"] == 0:
             continue
-        if _pattern_hits(f"{post.title} {demand_text}", PRODUCT_INTENT_PATTERNS) == 0:
+        if intent["product_intent"] == 0:
             continue
         normalized = _normalize_phrase(demand_text or post.title)
         if not normalized:
@@ -217,80 +236,156 @@ def extract_demand_candidates(
             demand_text=_shorten(demand_text),
             normalized_text=normalized,
             confidence_score=confidence,
-            urgency_score=_urgency_score(post.title, post.selftext),
+            urgency_score=hits["urgency"],
             keyword_tokens=_keyword_tokens(demand_text),
             permalink=post.permalink,
             url=post.url,
         )
-        out.append(candidate)
+        yield candidate
 
-    return out
 
+def _extract_chunk(
+    posts: Sequence[RedditPost], cutoff: float, min_score: int, exclude_self_promo: bool
+) -> List[DemandCandidate]:
+    return list(_iter_candidates(posts, cutoff, min_score, exclude_self_promo))
 
-def _similarity(a: str, b: str) -> float:
-    seq = SequenceMatcher(a=a, b=b).ratio()
-    a_set = set(a.split())
-    b_set = set(b.split())
-    if not a_set or not b_set:
-        return seq
-    inter = len(a_set & b_set)
-    union = len(a_set | b_set)
-    jaccard = inter / union if union else 0.0
-    return max(seq, jaccard)
 
+def iter_demand_candidates(
+    posts: Iterable[RedditPost], max_age_hours: int, min_score: int, exclude_self_promo: bool = True
+) -> Iterator[DemandCandidate]:
+    # Streaming variant: pulls posts lazily and yields candidates as they are found.
+    cutoff = time.time() - max_age_hours * 3600
+    return _iter_candidates(posts, cutoff, min_score, exclude_self_promo)
 
-def cluster_demands(candidates: Sequence[DemandCandidate], threshold: float = 0.72) -> List[DemandCluster]:
-    clusters: List[DemandCluster] = []
 
-    for candidate in sorted(candidates, key=lambda x: x.confidence_score, reverse=True):
-        best_idx = -1
-        best_sim = 0.0
-        for idx, cluster in enumerate(clusters):
-            sim = _similarity(candidate.normalized_text, cluster.normalized_anchor)
-            if sim > best_sim:
-                best_sim = sim
-                best_idx = idx
-
-        if best_idx >= 0 and best_sim >= threshold:
-            cluster = clusters[best_idx]
-            cluster.demand_count += 1
-            cluster.confidence_avg += candidate.confidence_score
-            cluster.urgency_avg += candidate.urgency_score
-            cluster.examples.append(
-                {
-                    "title": candidate.title,
-                    "demand_text": candidate.demand_text,
-                    "subreddit": candidate.subreddit,
-                    "permalink": candidate.permalink,
-                    "confidence_score": candidate.confidence_score,
-                    "urgency_score": candidate.urgency_score,
-                }
-            )
-            cluster.examples = cluster.examples[:5]
-            cluster.subreddits.append(candidate.subreddit)
-            cluster.keywords.extend(candidate.keyword_tokens)
+def extract_demand_candidates(
+    posts: Sequence[RedditPost],
+    max_age_hours: int,
+    min_score: int,
+    exclude_self_promo: bool = True,
+    workers: int = 1,
+    parallel_threshold: int = PARALLEL_EXTRACT_MIN_POSTS,
+) -> List[DemandCandidate]:
+    # The cutoff is fixed once so every chunk filters against the same instant.
+    cutoff = time.time() - max_age_hours * 3600
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(posts) < parallel_threshold:
+        return _extract_chunk(posts, cutoff, min_score, exclude_self_promo)
+
+    # A few chunks per worker evens out uneven post lengths; map() keeps input order.
+    chunk_size = max(1, math.ceil(len(posts) / (workers * 4)))
+    chunks = [posts[i : i + chunk_size] for i in range(0, len(posts), chunk_size)]
+    out: List[DemandCandidate] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(
+            _extract_chunk,
+            chunks,
+            repeat(cutoff),
+            repeat(min_score),
+            repeat(exclude_self_promo),
+        ):
+            out.extend(part)
+    return out
+
+
+def _absorb(cluster: DemandCluster, candidate: DemandCandidate) -> None:
+    cluster.demand_count += 1
+    cluster.confidence_avg += candidate.confidence_score
+    cluster.urgency_avg += candidate.urgency_score
+    cluster.examples.append(
+        {
+            "title": candidate.title,
+            "demand_text": candidate.demand_text,
+            "subreddit": candidate.subreddit,
+            "permalink": candidate.permalink,
+            "confidence_score": candidate.confidence_score,
+            "urgency_score": candidate.urgency_score,
+        }
+    )
+    cluster.examples = cluster.examples[:5]
+    cluster.subreddits.append(candidate.subreddit)
+    cluster.keywords.extend(candidate.keyword_tokens)
+
+
+def cluster_demands(
+    candidates: Sequence[DemandCandidate],
+    threshold: float = 0.72,
+    engine: str = "index",
+    store: Optional[ClusterStore] = None,
+) -> List[DemandCluster]:
+    clusters: List[DemandCluster] = []
+    ordered = sorted(candidates, key=lambda x: x.confidence_score, reverse=True)
+    known = store.load_anchors() if store is not None else []
+    matcher = build_matcher(
+        engine,
+        threshold,
+        corpus=[k.normalized_anchor for k in known] + [c.normalized_text for c in ordered],
+    )
+
+    # Matcher slot -> stored cluster (if any) and the cluster built for this run (once touched).
+    slot_stored: List[Optional[StoredCluster]] = []
+    slot_clusters: List[Optional[DemandCluster]] = []
+    slot_by_id: Dict[str, int] = {}
+    for stored in known:
+        slot_by_id[stored.cluster_id] = matcher.add(stored.normalized_anchor)
+        slot_stored.append(stored)
+        slot_clusters.append(None)
+
+    prior = store.prior_assignments(candidate_key(c) for c in ordered) if store is not None else {}
+    next_seq = store.next_seq() if store is not None else 1
+    new_clusters: List[StoredCluster] = []
+    new_assignments: List[Tuple[str, DemandCandidate]] = []
+
+    for candidate in ordered:
+        # Candidates clustered by an earlier run keep their cluster and are not re-scored.
+        slot = slot_by_id.get(prior.get(candidate_key(candidate), ""), -1)
+        is_new = slot < 0
+        if is_new:
+            best_idx, best_sim = matcher.best_match(candidate.normalized_text)
+            if best_idx >= 0 and best_sim >= threshold:
+                slot = best_idx
+
+        if slot >= 0:
+            cluster = slot_clusters[slot]
+            if cluster is None:
+                stored = slot_stored[slot]
+                cluster = DemandCluster(
+                    cluster_id=stored.cluster_id,
+                    summary_demand=stored.summary_demand,
+                    normalized_anchor=stored.normalized_anchor,
+                )
+                slot_clusters[slot] = cluster
+                clusters.append(cluster)
         else:
             cluster = DemandCluster(
-                cluster_id=f"demand_{len(clusters) + 1:03d}",
+                cluster_id=cluster_id_for(next_seq),
                 summary_demand=candidate.demand_text,
                 normalized_anchor=candidate.normalized_text,
-                demand_count=1,
-                confidence_avg=float(candidate.confidence_score),
-                urgency_avg=float(candidate.urgency_score),
-                keywords=list(candidate.keyword_tokens),
-                subreddits=[candidate.subreddit],
-                examples=[
-                    {
-                        "title": candidate.title,
-                        "demand_text": candidate.demand_text,
-                        "subreddit": candidate.subreddit,
-                        "permalink": candidate.permalink,
-                        "confidence_score": candidate.confidence_score,
-                        "urgency_score": candidate.urgency_score,
-                    }
-                ],
             )
+            slot = matcher.add(candidate.normalized_text)
+            slot_by_id[cluster.cluster_id] = slot
+            slot_stored.append(None)
+            slot_clusters.append(cluster)
             clusters.append(cluster)
+            new_clusters.append(
+                StoredCluster(
+                    seq=next_seq,
+                    cluster_id=cluster.cluster_id,
+                    summary_demand=cluster.summary_demand,
+                    normalized_anchor=cluster.normalized_anchor,
+                )
+            )
+            next_seq += 1
+
+        _absorb(cluster, candidate)
+        if is_new:
+            new_assignments.append((cluster.cluster_id, candidate))
+
+    history: Dict[str, ClusterHistory] = {}
+    if store is not None:
+        store.apply(new_clusters, new_assignments)
+        history = store.history(c.cluster_id for c in clusters)
 
     for cluster in clusters:
         cluster.confidence_avg = round(cluster.confidence_avg / max(cluster.demand_count, 1), 2)
@@ -298,19 +393,32 @@ def cluster_demands(candidates: Sequence[DemandCandidate], threshold: float = 0.
         cluster.subreddits = sorted(set(cluster.subreddits))
         keyword_counts = Counter(cluster.keywords)
         cluster.keywords = [word for word, _ in keyword_counts.most_common(8)]
+        past = history.get(cluster.cluster_id)
+        if past is not None:
+            cluster.total_demand_count = past.demand_count
+            cluster.first_seen_utc = past.first_seen
+            cluster.total_keywords = past.keywords
+        else:
+            cluster.total_demand_count = cluster.demand_count
+            cluster.total_keywords = list(cluster.keywords)
 
     clusters.sort(key=lambda c: (c.demand_count, c.confidence_avg, c.urgency_avg), reverse=True)
     return clusters
 
 
+def meta_summary_from_counts(post_counts: Mapping[str, int], total_candidates: int, total_clusters: int) -> Dict:
+    return {
+        "total_posts": sum(post_counts.values()),
+        "total_candidates": total_candidates,
+        "total_clusters": total_clusters,
+        "subreddit_post_counts": dict(sorted(post_counts.items(), key=lambda x: x[1], reverse=True)),
+    }
+
+
 def build_meta_summary(posts: Sequence[RedditPost], candidates: Sequence[DemandCandidate], clusters: Sequence[DemandCluster]) -> Dict:
+    if isinstance(posts, PostBatch):
+        return meta_summary_from_counts(posts.source_counts(), len(candidates), len(clusters))
     sub_counts: Dict[str, int] = defaultdict(int)
     for post in posts:
         sub_counts[post.subreddit] += 1
-
-    return {
-        "total_posts": len(posts),
-        "total_candidates": len(candidates),
-        "total_clusters": len(clusters),
-        "subreddit_post_counts": dict(sorted(sub_counts.items(), key=lambda x: x[1], reverse=True)),
-    }
+    return meta_summary_from_counts(sub_counts, len(candidates), len(clusters))
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from .models import RedditPost
+from .social_client import HN_REFRESH_BATCH, HN_SEARCH_URL, SE_SEARCH_URL, SearchPage, SocialClient
+
+
+@dataclass
+class FetchJob:
+    source: str
+    query: str
+    site: str = ""
+    # High-water mark from a previous run: only items newer than this (or unseen at it) are kept.
+    since_utc: Optional[float] = None
+    known_ids: FrozenSet[str] = frozenset()
+
+    @property
+    def key(self) -> str:
+        return f"{self.source}:{self.site}:{self.query}"
+
+    @property
+    def label(self) -> str:
+        if self.source == "hackernews":
+            return f"HN query '{self.query}'"
+        return f"SE({self.site}) query '{self.query}'"
+
+    @property
+    def failure_label(self) -> str:
+        if self.source == "hackernews":
+            return f"HN query='{self.query}'"
+        return f"StackExchange query='{self.query}'"
+
+
+@dataclass
+class FetchResult:
+    job: FetchJob
+    posts: List[RedditPost] = field(default_factory=list)
+    error: Optional[Exception] = None
+    pages_fetched: int = 0
+    # Summed over this job's page requests, including waits for host slots and rate limits.
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+
+
+@dataclass
+class RefreshResult:
+    # Story ID -> (points, num_comments) for every story the API still returned.
+    engagement: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    requests: int = 0
+    errors: List[Exception] = field(default_factory=list)
+
+
+@dataclass
+class _JobState:
+    job: FetchJob
+    pages_needed: int
+    page_size: int
+    pages: Dict[int, List[RedditPost]] = field(default_factory=dict)
+    error: Optional[Exception] = None
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+
+
+class FetchEngine:
+    def __init__(
+        self,
+        client: SocialClient,
+        workers: int = 4,
+        per_host_limit: int = 2,
+        host_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.client = client
+        self.workers = max(1, workers)
+        self.per_host_limit = max(1, per_host_limit)
+        # Per-host overrides of per_host_limit, keyed by netloc.
+        self.host_limits = {host: max(1, limit) for host, limit in (host_limits or {}).items()}
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+        self._timing_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.host_limits.get(host, self.per_host_limit))
+                self._host_slots[host] = slot
+            return slot
+
+    def _fetch_page(self, state: _JobState, page: int, from_date_utc: Optional[int]) -> SearchPage:
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            return self._fetch_page_timed(state, page, from_date_utc)
+        finally:
+            # Pages of one job can run on several workers at once.
+            with self._timing_lock:
+                state.wall_s += time.perf_counter() - started
+                state.cpu_s += time.thread_time() - cpu_started
+
+    def _fetch_page_timed(self, state: _JobState, page: int, from_date_utc: Optional[int]) -> SearchPage:
+        job = state.job
+        since = from_date_utc
+        if job.since_utc is not None:
+            since = max(since or 0, int(job.since_utc))
+        if job.source == "hackernews":
+            with self._host_slot(HN_SEARCH_URL):
+                result = self.client.fetch_hn_page(
+                    job.query, page=page, hits_per_page=state.page_size, created_since_utc=since
+                )
+        else:
+            with self._host_slot(SE_SEARCH_URL):
+                result = self.client.fetch_stackexchange_page(
+                    job.query,
+                    site=job.site,
+                    page=page,
+                    page_size=state.page_size,
+                    from_date_utc=since,
+                )
+        return self._drop_known(job, result)
+
+    def refresh_hn(self, story_ids: Sequence[str], batch_size: int = HN_REFRESH_BATCH) -> RefreshResult:
+        ids = list(dict.fromkeys(story_ids))
+        size = max(1, batch_size)
+        batches = [ids[start : start + size] for start in range(0, len(ids), size)]
+        result = RefreshResult(requests=len(batches))
+
+        def fetch(batch: List[str]) -> Dict[str, Tuple[int, int]]:
+            with self._host_slot(HN_SEARCH_URL):
+                return self.client.fetch_hn_engagement(batch)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for future in as_completed([pool.submit(fetch, batch) for batch in batches]):
+                try:
+                    result.engagement.update(future.result())
+                except Exception as exc:
+                    result.errors.append(exc)
+        return result
+
+    @staticmethod
+    def _drop_known(job: FetchJob, result: SearchPage) -> SearchPage:
+        if job.since_utc is None:
+            return result
+        fresh = [
+            post
+            for post in result.posts
+            if post.created_utc > job.since_utc or (post.created_utc == job.since_utc and post.id not in job.known_ids)
+        ]
+        if len(fresh) == len(result.posts):
+            return result
+        # Results are newest-first, so hitting a known item means everything after it is known too.
+        return SearchPage(posts=fresh, raw_count=result.raw_count, has_more=False, page_count=result.page_count)
+
+    @staticmethod
+    def _first_page(job: FetchJob) -> int:
+        # Algolia pages are 0-based, StackExchange pages are 1-based.
+        return 0 if job.source == "hackernews" else 1
+
+    def run(
+        self,
+        jobs: Sequence[FetchJob],
+        limit: int,
+        from_date_utc: Optional[int] = None,
+        on_result: Optional[Callable[[FetchResult], None]] = None,
+    ) -> List[FetchResult]:
+        results: List[Optional[FetchResult]] = [None] * len(jobs)
+        for idx, result in self.iter_results(jobs, limit, from_date_utc=from_date_utc):
+            results[idx] = result
+            if on_result is not None:
+                on_result(result)
+        return [r for r in results if r is not None]
+
+    def iter_results(
+        self,
+        jobs: Sequence[FetchJob],
+        limit: int,
+        from_date_utc: Optional[int] = None,
+    ) -> Iterator[Tuple[int, FetchResult]]:
+        # Yields (job index, result) as each job completes; finished pages are not retained.
+        limit = max(1, limit)
+        page_size = min(100, limit)
+        pages_needed = math.ceil(limit / page_size)
+        states = [_JobState(job=job, pages_needed=pages_needed, page_size=page_size) for job in jobs]
+        pending: Dict[Future, Tuple[int, int]] = {}
+        outstanding = [0] * len(states)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+
+            def submit(idx: int, page: int) -> None:
+                future = pool.submit(self._fetch_page, states[idx], page, from_date_utc)
+                pending[future] = (idx, page)
+                outstanding[idx] += 1
+
+            for idx, state in enumerate(states):
+                submit(idx, self._first_page(state.job))
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx, page = pending.pop(future)
+                    outstanding[idx] -= 1
+                    state = states[idx]
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        if state.error is None:
+                            state.error = exc
+                    else:
+                        state.pages[page] = result.posts
+                        if state.error is None:
+                            self._schedule_more(state, idx, page, result, submit)
+
+                    if outstanding[idx] == 0:
+                        finished = self._finish(state, limit)
+                        state.pages = {}
+                        yield idx, finished
+
+    def _schedule_more(
+        self,
+        state: _JobState,
+        idx: int,
+        page: int,
+        result: SearchPage,
+        submit: Callable[[int, int], None],
+    ) -> None:
+        if not result.has_more:
+            return
+        first = self._first_page(state.job)
+        last = first + state.pages_needed - 1
+        if state.job.source == "hackernews" and page == first:
+            # Algolia reports the page count up front, so fan out the rest at once.
+            if result.page_count:
+                last = min(last, first + result.page_count - 1)
+            for next_page in range(page + 1, last + 1):
+                submit(idx, next_page)
+        elif state.job.source != "hackernews" and page < last:
+            submit(idx, page + 1)
+
+    @staticmethod
+    def _finish(state: _JobState, limit: int) -> FetchResult:
+        posts: List[RedditPost] = []
+        for page in sorted(state.pages):
+            posts.extend(state.pages[page])
+        return FetchResult(
+            job=state.job,
+            posts=posts[:limit],
+            error=state.error,
+            pages_fetched=len(state.pages),
+            wall_s=state.wall_s,
+            cpu_s=state.cpu_s,
+        )
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    stored_at: float
+    payload: Dict
+    etag: str = ""
+    last_modified: str = ""
+
+    def is_fresh(self, ttl_s: float) -> bool:
+        return (time.time() - self.stored_at) < ttl_s
+
+    def revalidation_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: Path, ttl_s: float = 6 * 3600, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.cache_dir = cache_dir
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes = sum(p.stat().st_size for p in self._entry_files())
+        self.stats: Dict[str, int] = {"hits": 0, "revalidated": 0, "misses": 0}
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None) -> str:
+        normalized = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+        material = json.dumps([url, normalized], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _entry_files(self):
+        return self.cache_dir.glob("*/*.json")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self._path(key)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            # Bump mtime so size-based eviction drops the least recently used entries first.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(
+            url=str(raw.get("url", "")),
+            stored_at=float(raw.get("stored_at", 0.0)),
+            payload=raw.get("payload", {}),
+            etag=str(raw.get("etag") or ""),
+            last_modified=str(raw.get("last_modified") or ""),
+        )
+
+    def put(self, key: str, url: str, payload: Dict, etag: str = "", last_modified: str = "") -> None:
+        entry = {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": etag or "",
+            "last_modified": last_modified or "",
+            "payload": payload,
+        }
+        self._write(key, entry)
+
+    def touch(self, key: str, entry: CacheEntry) -> None:
+        self.put(key, entry.url, entry.payload, entry.etag, entry.last_modified)
+
+    def _write(self, key: str, entry: Dict) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        old_size = path.stat().st_size if path.exists() else 0
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+        with self._lock:
+            self._total_bytes += len(data) - old_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            files = []
+            for path in self._entry_files():
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            # Trim to 90% of the budget so we do not evict on every subsequent write.
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in sorted(files, key=lambda x: x[0]):
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+            self._total_bytes = total
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from .models import RedditPost
+
+_POST_FIELDS = [f.name for f in fields(RedditPost)]
+
+
+@dataclass
+class Watermark:
+    created_utc: float
+    post_ids: List[str] = field(default_factory=list)
+    updated_at: str = ""
+
+
+class IncrementalStore:
+    def __init__(self, state_dir: Path) -> None:
+        self.state_dir = state_dir
+        self.watermarks_path = state_dir / "watermarks.json"
+        self.window_path = state_dir / "window_posts.jsonl"
+        self.watermarks: Dict[str, Watermark] = {}
+        if self.watermarks_path.exists():
+            raw = json.loads(self.watermarks_path.read_text(encoding="utf-8"))
+            for key, value in raw.get("watermarks", {}).items():
+                self.watermarks[key] = Watermark(
+                    created_utc=float(value.get("created_utc", 0.0)),
+                    post_ids=[str(x) for x in value.get("post_ids", [])],
+                    updated_at=str(value.get("updated_at", "")),
+                )
+
+    def watermark(self, key: str) -> Optional[Watermark]:
+        return self.watermarks.get(key)
+
+    def advance(self, key: str, posts: Sequence[RedditPost]) -> None:
+        if not posts:
+            return
+        newest = max(p.created_utc for p in posts)
+        current = self.watermarks.get(key)
+        if current is not None and current.created_utc > newest:
+            return
+        ids = {p.id for p in posts if p.created_utc == newest}
+        if current is not None and current.created_utc == newest:
+            ids.update(current.post_ids)
+        self.watermarks[key] = Watermark(
+            created_utc=newest,
+            post_ids=sorted(ids),
+            updated_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+    def load_window(self, cutoff_utc: float) -> List[RedditPost]:
+        return list(self.iter_window(cutoff_utc))
+
+    def iter_window(self, cutoff_utc: float) -> Iterator[RedditPost]:
+        if not self.window_path.exists():
+            return
+        with self.window_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                if float(row.get("created_utc", 0.0)) < cutoff_utc:
+                    continue
+                yield RedditPost(**{name: row[name] for name in _POST_FIELDS})
+
+    def save_watermarks(self) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "watermarks": {
+                key: {"created_utc": wm.created_utc, "post_ids": wm.post_ids, "updated_at": wm.updated_at}
+                for key, wm in sorted(self.watermarks.items())
+            }
+        }
+        self.watermarks_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    @contextmanager
+    def window_writer(self, cutoff_utc: float) -> Iterator[Callable[[RedditPost], None]]:
+        # Rows go to a temp file that replaces the window only on success, so the old window can
+        # still be read while the new one is being written.
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.window_path.with_suffix(".jsonl.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+
+            def add(post: RedditPost) -> None:
+                if post.created_utc >= cutoff_utc:
+                    f.write(json.dumps(post.to_dict(), ensure_ascii=False) + "\n")
+
+            try:
+                yield add
+            except BaseException:
+                f.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+        os.replace(tmp_path, self.window_path)
+
+    def save(self, window_posts: Sequence[RedditPost], cutoff_utc: float) -> None:
+        self.save_watermarks()
+        with self.window_writer(cutoff_utc) as add:
+            for post in sorted(window_posts, key=lambda p: (p.created_utc, p.id)):
+                add(post)
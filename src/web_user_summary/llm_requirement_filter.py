@@ -4,11 +4,19 @@ import argparse
 import json
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
 
 import requests
 
+from .artifacts import load_clusters
+from .rate_limit import backoff_delay
+from .requirement_prefilter import PREFILTER_REASON_PREFIX, agreement, prefilter_clusters
+from .verdict_cache import DEFAULT_MAX_AGE_S, VerdictCache, verdict_key
+
 
 SYSTEM_PROMPT = """You are a strict product requirement triage reviewer.
 
@@ -29,11 +37,59 @@ Reject when:
 Return JSON only.
 """
 
+# Cluster fields read by the prompt, the pre-filter and the accepted-output enrichment.
+CLUSTER_FIELDS = (
+    "cluster_id",
+    "summary_demand",
+    "demand_count",
+    "confidence_avg",
+    "urgency_avg",
+    "keywords",
+    "subreddits",
+    "examples",
+)
+
+# Prompt-side budget per OpenAI request (system prompt + items), in estimated tokens.
+DEFAULT_TOKEN_BUDGET = 6000
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="LLM-filter demand clusters to clear user requirements.")
-    parser.add_argument("--input-dir", default="", help="Directory containing demand_clusters.json (default: latest in data/).")
-    parser.add_argument("--batch-size", type=int, default=15)
+    parser.add_argument("--input-dir", default="", help="Run directory with demand_clusters artifacts (default: latest in data/).")
+    parser.add_argument("--batch-size", type=int, default=40, help="Max clusters per OpenAI request.")
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=DEFAULT_TOKEN_BUDGET,
+        help="Pack OpenAI requests up to this many estimated prompt tokens.",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent LLM requests (OpenAI batches or Ollama items).")
+    parser.add_argument("--max-retries", type=int, default=2, help="Retries per batch/item on transient failures.")
+    parser.add_argument(
+        "--checkpoint",
+        default="",
+        help=f"Verdict checkpoint JSONL used to resume an interrupted review (default: <input-dir>/{CHECKPOINT_NAME}).",
+    )
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and review every cluster again.")
+    parser.add_argument(
+        "--prefilter",
+        choices=["on", "off", "shadow"],
+        default="shadow",
+        help="Heuristic tier for clear-cut rejects (mostly self-promotion or a low signal score). 'shadow' (default) "
+        "only scores it against the LLM verdicts; 'on' skips the LLM for those rejects unless a cached verdict exists.",
+    )
+    parser.add_argument(
+        "--verdict-cache",
+        default="",
+        help="SQLite file of past verdicts keyed by provider/model/prompt and the normalized requirement text; "
+        "requirements seen before skip the LLM (default: disabled).",
+    )
+    parser.add_argument(
+        "--verdict-cache-max-age-days",
+        type=float,
+        default=DEFAULT_MAX_AGE_S / 86400,
+        help="Re-review items whose cached verdict is older than this.",
+    )
     parser.add_argument("--provider", choices=["auto", "ollama", "openai"], default="auto")
     parser.add_argument("--ollama-model", default="qwen2.5:0.5b")
     parser.add_argument("--openai-model", default=os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
@@ -124,39 +180,284 @@ def choose_provider(requested: str) -> str:
     return "openai" if os.getenv("OPENAI_API_KEY") else "ollama"
 
 
-def llm_classify_all(clusters: List[Dict], provider: str, model: str, batch_size: int) -> List[Dict]:
-    results: List[Dict] = []
+def build_item(cluster: Dict) -> Dict:
+    return {
+        "cluster_id": cluster.get("cluster_id"),
+        "summary_demand": cluster.get("summary_demand", ""),
+        "keywords": cluster.get("keywords", []),
+        "mention_count": cluster.get("demand_count", 0),
+        "examples": cluster.get("examples", [])[:2],
+    }
+
+
+def _openai_batch_results(payload: Dict) -> List[Dict]:
+    batch_results = payload.get("results", payload.get("items", []))
+    if not isinstance(batch_results, list):
+        raise ValueError(f"Unexpected LLM payload: {payload}")
+    return batch_results
+
+
+def _request_openai_batch(model: str, batch: List[Dict]) -> List[Dict]:
+    return _openai_batch_results(call_openai(model=model, items=batch))
+
+
+def _request_ollama_item(model: str, item: Dict) -> List[Dict]:
+    return [call_ollama_single(model=model, item=item)]
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    # Connection errors, timeouts and unparseable model output are worth another attempt.
+    return isinstance(exc, (requests.RequestException, ValueError))
+
+
+def _call_with_retries(call: Callable[[], List[Dict]], max_retries: int) -> Tuple[List[Dict], float, int]:
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            return call(), time.perf_counter() - started, attempt + 1
+        except Exception as exc:
+            if attempt >= max_retries or not _is_retryable(exc):
+                raise
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English JSON; close enough to keep batches clear of the limit.
+    return len(text) // 4 + 1
+
+
+def item_tokens(item: Dict) -> int:
+    return estimate_tokens(json.dumps(item, ensure_ascii=False)) + 2
+
+
+def pack_batches(items: List[Dict], token_budget: int, max_items: int) -> List[List[Dict]]:
+    # Greedy in input order: a batch closes when the next item would push the prompt over the
+    # budget or the batch reaches max_items. An oversized item still gets a batch of its own.
+    base = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(build_user_prompt([]))
+    batches: List[List[Dict]] = []
+    current: List[Dict] = []
+    used = base
+    for item in items:
+        cost = item_tokens(item)
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            used = base
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _classify_openai_unit(model: str, unit: List[Dict], max_retries: int) -> Tuple[List[Dict], float, int]:
+    # Unparseable batches are split in half and items the model skipped are re-sent, so a bad
+    # response costs a few smaller requests instead of the whole run. A single item that still
+    # fails is dropped and ends up as the default "no classifier output" reject.
+    try:
+        results, latency, attempts = _call_with_retries(partial(_request_openai_batch, model, unit), max_retries)
+    except ValueError:
+        if len(unit) == 1:
+            print(f"[WARN] Dropping {unit[0]['cluster_id']}: unparseable LLM output", flush=True)
+            return [], 0.0, max_retries + 1
+        half = len(unit) // 2
+        left = _classify_openai_unit(model, unit[:half], max_retries)
+        right = _classify_openai_unit(model, unit[half:], max_retries)
+        return left[0] + right[0], left[1] + right[1], max_retries + 1 + left[2] + right[2]
+
+    returned = {str(r.get("cluster_id", "")).strip() for r in results if isinstance(r, dict)}
+    missing = [item for item in unit if str(item["cluster_id"]).strip() not in returned]
+    if missing and len(unit) > 1:
+        if len(missing) == len(unit):
+            half = len(unit) // 2
+            parts = [unit[:half], unit[half:]]
+        else:
+            parts = [missing]
+        for part in parts:
+            more, more_latency, more_attempts = _classify_openai_unit(model, part, max_retries)
+            results = results + more
+            latency += more_latency
+            attempts += more_attempts
+        position = {str(item["cluster_id"]).strip(): idx for idx, item in enumerate(unit)}
+        results.sort(key=lambda r: position.get(str(r.get("cluster_id", "")).strip(), len(unit)))
+    return results, latency, attempts
+
+
+def _unit_label(unit: List[Dict]) -> str:
+    if len(unit) == 1:
+        return str(unit[0]["cluster_id"])
+    return f"{unit[0]['cluster_id']}..{unit[-1]['cluster_id']} ({len(unit)} items)"
+
+
+def _print_latency_summary(latencies: List[float], wall_s: float, workers: int) -> None:
+    if not latencies:
+        return
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"LLM latency over {len(ordered)} calls: p50={p50:.1f}s p95={p95:.1f}s max={ordered[-1]:.1f}s; "
+        f"wall {wall_s:.1f}s with {workers} workers",
+        flush=True,
+    )
+
+
+def _classify_items(
+    items: List[Dict],
+    provider: str,
+    model: str,
+    batch_size: int,
+    workers: int,
+    max_retries: int,
+    token_budget: int,
+    on_results: Optional[Callable[[List[Dict]], None]] = None,
+) -> List[Dict]:
+    if not items:
+        return []
     if provider == "openai":
-        for i in range(0, len(clusters), batch_size):
-            batch = clusters[i : i + batch_size]
-            items = [
-                {
-                    "cluster_id": c.get("cluster_id"),
-                    "summary_demand": c.get("summary_demand", ""),
-                    "keywords": c.get("keywords", []),
-                    "mention_count": c.get("demand_count", 0),
-                    "examples": c.get("examples", [])[:2],
-                }
-                for c in batch
-            ]
-            payload = call_openai(model=model, items=items)
-            batch_results = payload.get("results", payload.get("items", []))
-            if not isinstance(batch_results, list):
-                raise RuntimeError(f"Unexpected LLM payload: {payload}")
-            results.extend(batch_results)
+        units = pack_batches(items, token_budget=token_budget, max_items=max(1, batch_size))
+        print(f"OpenAI batching: {len(items)} items in {len(units)} requests (token budget {token_budget})", flush=True)
+
+        def run_unit(unit: List[Dict]) -> Tuple[List[Dict], float, int]:
+            return _classify_openai_unit(model, unit, max_retries)
+
     else:
-        total = len(clusters)
-        for idx, c in enumerate(clusters, start=1):
-            item = {
-                "cluster_id": c.get("cluster_id"),
-                "summary_demand": c.get("summary_demand", ""),
-                "keywords": c.get("keywords", []),
-                "mention_count": c.get("demand_count", 0),
-                "examples": c.get("examples", [])[:2],
-            }
-            print(f"LLM reviewing {idx}/{total} - {item['cluster_id']}", flush=True)
-            results.append(call_ollama_single(model=model, item=item))
-    return results
+        units = [[item] for item in items]
+
+        def run_unit(unit: List[Dict]) -> Tuple[List[Dict], float, int]:
+            return _call_with_retries(partial(_request_ollama_item, model, unit[0]), max_retries)
+
+    # Each unit (an OpenAI batch or one Ollama item) is retried on its own; results are
+    # reassembled in input order regardless of completion order.
+    workers = max(1, workers)
+    unit_results: List[List[Dict]] = [[] for _ in units]
+    latencies: List[float] = []
+    started = time.perf_counter()
+    error: Optional[Exception] = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_unit, unit): idx for idx, unit in enumerate(units)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            idx = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                results, latency, attempts = future.result()
+            except Exception as exc:
+                # Stop scheduling new units, but still hand over those already in flight.
+                if error is None:
+                    error = exc
+                    for pending in futures:
+                        pending.cancel()
+                continue
+            unit_results[idx] = results
+            if on_results is not None:
+                on_results(results)
+            latencies.append(latency)
+            retried = f" after {attempts} attempts" if attempts > 1 else ""
+            print(f"LLM reviewed {done}/{len(units)} - {_unit_label(units[idx])} in {latency:.1f}s{retried}", flush=True)
+    if error is not None:
+        raise error
+    _print_latency_summary(latencies, time.perf_counter() - started, workers)
+    return [result for unit in unit_results for result in unit]
+
+
+def llm_classify_all(
+    clusters: List[Dict],
+    provider: str,
+    model: str,
+    batch_size: int,
+    workers: int = 4,
+    max_retries: int = 2,
+    cache: Optional[VerdictCache] = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    on_results: Optional[Callable[[List[Dict]], None]] = None,
+) -> List[Dict]:
+    # on_results receives each batch of raw verdicts as soon as it arrives (cache hits first).
+    items = [build_item(c) for c in clusters]
+    if cache is None:
+        return _classify_items(items, provider, model, batch_size, workers, max_retries, token_budget, on_results)
+
+    # Cached verdicts skip the network; only misses are batched and sent to the model.
+    keys = [verdict_key(provider, model, SYSTEM_PROMPT, item) for item in items]
+    found = cache.get_many(keys)
+    # Cached verdicts may come from another run, where the same requirement had another cluster id.
+    cached = [
+        {**found[key], "cluster_id": str(item.get("cluster_id", "")).strip()} if key in found else None
+        for item, key in zip(items, keys)
+    ]
+    if found and on_results is not None:
+        on_results([verdict for verdict in cached if verdict is not None])
+    misses = [item for item, key in zip(items, keys) if key not in found]
+    miss_keys = {str(item.get("cluster_id", "")).strip(): key for item, key in zip(items, keys) if key not in found}
+
+    def record(results: List[Dict]) -> None:
+        # Stored per unit so verdicts survive a later failure in the same run.
+        verdicts = [normalize_result(r) for r in results if isinstance(r, dict)]
+        cache.put_many(provider, model, [(miss_keys[v["cluster_id"]], v) for v in verdicts if v["cluster_id"] in miss_keys])
+        if on_results is not None:
+            on_results(results)
+
+    fresh = _classify_items(misses, provider, model, batch_size, workers, max_retries, token_budget, record)
+
+    fresh_by_id: Dict[str, Dict] = {}
+    extra: List[Dict] = []
+    for result in fresh:
+        cid = str(result.get("cluster_id", "")).strip()
+        if cid in miss_keys and cid not in fresh_by_id:
+            fresh_by_id[cid] = result
+        else:
+            extra.append(result)
+
+    results: List[Dict] = []
+    for item, verdict in zip(items, cached):
+        if verdict is not None:
+            results.append(verdict)
+            continue
+        result = fresh_by_id.get(str(item.get("cluster_id", "")).strip())
+        if result is not None:
+            results.append(result)
+    return results + extra
+
+
+CHECKPOINT_NAME = "llm_requirement_checkpoint.jsonl"
+
+
+def load_checkpoint(path: Path, provider: str, model: str) -> Dict[str, Dict]:
+    # Verdicts from a different provider/model are ignored, so switching models re-reviews.
+    reviewed: Dict[str, Dict] = {}
+    if not path.exists():
+        return reviewed
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted run.
+                continue
+            if row.get("provider") != provider or row.get("model") != model:
+                continue
+            verdict = row.get("verdict")
+            if isinstance(verdict, dict) and verdict.get("cluster_id"):
+                reviewed[verdict["cluster_id"]] = verdict
+    return reviewed
+
+
+def append_checkpoint(f: TextIO, provider: str, model: str, results: List[Dict]) -> None:
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        verdict = normalize_result(result)
+        if verdict["cluster_id"]:
+            f.write(json.dumps({"provider": provider, "model": model, "verdict": verdict}, ensure_ascii=False) + "\n")
+    f.flush()
 
 
 def render_review_md(path: Path, accepted: List[Dict], rejected: List[Dict]) -> None:
@@ -210,24 +511,77 @@ def main() -> None:
     root = Path(__file__).resolve().parents[2]
     base_data = root / "data" / "social_requirements"
     input_dir = Path(args.input_dir) if args.input_dir else latest_data_dir(base_data)
-    clusters_path = input_dir / "demand_clusters.json"
-
-    if not clusters_path.exists():
-        raise FileNotFoundError(f"Missing {clusters_path}")
-
-    obj = json.loads(clusters_path.read_text(encoding="utf-8"))
-    clusters = obj.get("clusters", [])
-    if not isinstance(clusters, list) or not clusters:
-        raise RuntimeError(f"No clusters found in {clusters_path}")
+    _, clusters = load_clusters(input_dir, fields=CLUSTER_FIELDS)
+    if not clusters:
+        raise RuntimeError(f"No clusters found in {input_dir}")
 
     provider = choose_provider(args.provider)
     model = args.openai_model if provider == "openai" else args.ollama_model
 
-    raw_results = llm_classify_all(clusters=clusters, provider=provider, model=model, batch_size=args.batch_size)
-    cleaned = [normalize_result(r) for r in raw_results if r.get("cluster_id")]
+    checkpoint_path = Path(args.checkpoint) if args.checkpoint else input_dir / CHECKPOINT_NAME
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    reviewed = load_checkpoint(checkpoint_path, provider, model)
+    pending = [c for c in clusters if str(c.get("cluster_id", "")).strip() not in reviewed]
+    if reviewed:
+        print(f"Checkpoint: {len(clusters) - len(pending)} clusters already reviewed, {len(pending)} remaining")
+
+    pending_by_id = {str(c.get("cluster_id", "")).strip(): c for c in pending}
+    decisions = prefilter_clusters(pending) if args.prefilter != "off" else []
+    decided = {d.cluster_id: d for d in decisions if d.decision == "reject"}
+
+    cache = None
+    past: Dict[str, bool] = {}
+    if args.verdict_cache:
+        cache = VerdictCache(Path(args.verdict_cache), max_age_s=args.verdict_cache_max_age_days * 86400)
+        cache.evict_expired()
+    try:
+        if cache is not None and decided:
+            # A cached LLM verdict outranks the heuristic: those clusters keep it (the cache answers them
+            # without an LLM call), and it also measures how often the pre-filter agrees.
+            keys = {cid: verdict_key(provider, model, SYSTEM_PROMPT, build_item(pending_by_id[cid])) for cid in decided}
+            found = cache.peek_many(keys.values())
+            past.update({cid: bool(found[key].get("accept")) for cid, key in keys.items() if key in found})
+        decided = {cid: d for cid, d in decided.items() if cid not in past}
+        to_llm = pending
+        if args.prefilter == "on":
+            to_llm = [c for c in pending if str(c.get("cluster_id", "")).strip() not in decided]
+        with checkpoint_path.open("a", encoding="utf-8") as checkpoint:
+            if args.prefilter == "on" and decided:
+                append_checkpoint(checkpoint, provider, model, [d.verdict() for d in decided.values()])
+            llm_classify_all(
+                clusters=to_llm,
+                provider=provider,
+                model=model,
+                batch_size=args.batch_size,
+                workers=args.workers,
+                max_retries=args.max_retries,
+                cache=cache,
+                token_budget=args.token_budget,
+                on_results=partial(append_checkpoint, checkpoint, provider, model),
+            )
+    finally:
+        if cache is not None:
+            cache.close()
 
+    # Outputs are rebuilt from the checkpoint, which holds this run's verdicts plus any resumed ones.
     # Ensure one output row per cluster, default to reject if missing.
-    by_id = {r["cluster_id"]: r for r in cleaned}
+    by_id = load_checkpoint(checkpoint_path, provider, model)
+    prefilter_stats = None
+    if decisions:
+        # This run's LLM verdicts cover heuristic accepts in both modes, and rejects in shadow mode.
+        past.update(
+            {cid: v["accept"] for cid, v in by_id.items() if not v.get("reason", "").startswith(PREFILTER_REASON_PREFIX)}
+        )
+        matching, compared = agreement(decisions, past)
+        prefilter_stats = {
+            "mode": args.prefilter,
+            "likely_accept": sum(1 for d in decisions if d.decision == "accept"),
+            "auto_rejected": len(decided),
+            "sent_to_llm": len(to_llm),
+            "agreement_matching": matching,
+            "agreement_compared": compared,
+        }
     final_results: List[Dict] = []
     for c in clusters:
         cid = str(c.get("cluster_id", "")).strip()
@@ -271,6 +625,8 @@ def main() -> None:
         "rejected_count": len(rejected),
         "results": final_results,
     }
+    if prefilter_stats is not None:
+        review_payload["prefilter"] = prefilter_stats
     review_path.write_text(json.dumps(review_payload, indent=2, ensure_ascii=False), encoding="utf-8")
     accepted_path.write_text(json.dumps({"accepted": accepted_enriched}, indent=2, ensure_ascii=False), encoding="utf-8")
     render_review_md(report_path, accepted=accepted, rejected=rejected)
@@ -278,6 +634,21 @@ def main() -> None:
     print(f"Input directory: {input_dir}")
     print(f"Provider/model: {provider}/{model}")
     print(f"Accepted: {len(accepted)} / {len(clusters)}")
+    if prefilter_stats is not None:
+        auto = prefilter_stats["auto_rejected"]
+        verb = "would skip" if args.prefilter == "shadow" else "skipped"
+        print(
+            f"Pre-filter ({args.prefilter}): {prefilter_stats['auto_rejected']} auto-rejected, "
+            f"{prefilter_stats['likely_accept']} likely accepts sent to the LLM; {verb} {auto}/{len(decisions)} LLM reviews "
+            f"({100.0 * auto / len(decisions):.0f}%)"
+        )
+        if prefilter_stats["agreement_compared"]:
+            print(
+                f"Pre-filter agreement with LLM verdicts: {prefilter_stats['agreement_matching']}/"
+                f"{prefilter_stats['agreement_compared']}"
+            )
+    if cache is not None:
+        print(cache.summary())
     print("")
     print("Accepted requirements:")
     for idx, item in enumerate(accepted_enriched, start=1):
@@ -4,7 +4,7 @@ from dataclasses import asdict, dataclass, field
 from typing import Dict, List
 
 
-@dataclass
+@dataclass(slots=True)
 class RedditPost:
     id: str
     subreddit: str
@@ -20,10 +20,24 @@ class RedditPost:
     sort_source: str
 
     def to_dict(self) -> Dict:
-        return asdict(self)
+        # Field-by-field copy: asdict() recurses and deep-copies, which dominates large dumps.
+        return {
+            "id": self.id,
+            "subreddit": self.subreddit,
+            "title": self.title,
+            "selftext": self.selftext,
+            "author": self.author,
+            "created_utc": self.created_utc,
+            "score": self.score,
+            "num_comments": self.num_comments,
+            "upvote_ratio": self.upvote_ratio,
+            "permalink": self.permalink,
+            "url": self.url,
+            "sort_source": self.sort_source,
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class DemandCandidate:
     post_id: str
     subreddit: str
@@ -38,7 +52,19 @@ class DemandCandidate:
     url: str
 
     def to_dict(self) -> Dict:
-        return asdict(self)
+        return {
+            "post_id": self.post_id,
+            "subreddit": self.subreddit,
+            "created_utc": self.created_utc,
+            "title": self.title,
+            "demand_text": self.demand_text,
+            "normalized_text": self.normalized_text,
+            "confidence_score": self.confidence_score,
+            "urgency_score": self.urgency_score,
+            "keyword_tokens": list(self.keyword_tokens),
+            "permalink": self.permalink,
+            "url": self.url,
+        }
 
 
 @dataclass
@@ -52,6 +78,10 @@ class DemandCluster:
     keywords: List[str] = field(default_factory=list)
     subreddits: List[str] = field(default_factory=list)
     examples: List[Dict] = field(default_factory=list)
+    # Across every run recorded in the cluster store; this run's figures when there is no store.
+    total_demand_count: int = 0
+    first_seen_utc: float = 0.0
+    total_keywords: List[str] = field(default_factory=list)
 
     def to_dict(self) -> Dict:
         return asdict(self)
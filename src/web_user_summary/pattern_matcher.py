@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+# Text is split into alternating word / non-word runs, so a `\b...\b` phrase pattern is an exact
+# sequence of runs. Matching then needs one tokenizing regex pass plus dict lookups per run.
+_RUN_RE = re.compile(r"\w+|\W+")
+_GROUP_RE = re.compile(r"\(\?:([^()]*)\)")
+_REGEX_META_RE = re.compile(r"[\\.^$*+?{}\[\]()|]")
+
+
+def _expand_alternations(body: str) -> List[str]:
+    match = _GROUP_RE.search(body)
+    if not match:
+        return [body]
+    out: List[str] = []
+    for alt in match.group(1).split("|"):
+        out.extend(_expand_alternations(body[: match.start()] + alt + body[match.end() :]))
+    return out
+
+
+def _literal_phrases(pattern: str) -> List[str]:
+    # Returns the literal phrases a `\b<words>\b` pattern matches, or [] if it needs a real regex.
+    if not (pattern.startswith(r"\b") and pattern.endswith(r"\b")):
+        return []
+    phrases = _expand_alternations(pattern[2:-2])
+    for phrase in phrases:
+        if not phrase or _REGEX_META_RE.search(phrase) or phrase != phrase.lower():
+            return []
+        if not (phrase[0].isalnum() or phrase[0] == "_") or not (phrase[-1].isalnum() or phrase[-1] == "_"):
+            return []
+    return phrases
+
+
+class PatternMatcher:
+    def __init__(self, families: Mapping[str, Sequence[str]]) -> None:
+        self.families = list(families)
+        self._pattern_family: List[int] = []
+        self._first_run: Dict[str, List[Tuple[int, Tuple[str, ...]]]] = {}
+        self._fallback: List[Tuple[int, re.Pattern]] = []
+
+        for family_idx, name in enumerate(self.families):
+            for pattern in families[name]:
+                pattern_idx = len(self._pattern_family)
+                self._pattern_family.append(family_idx)
+                phrases = _literal_phrases(pattern)
+                if not phrases:
+                    self._fallback.append((pattern_idx, re.compile(pattern, flags=re.IGNORECASE)))
+                    continue
+                for phrase in phrases:
+                    runs = tuple(_RUN_RE.findall(phrase))
+                    self._first_run.setdefault(runs[0], []).append((pattern_idx, runs))
+
+    def hits(self, text: str) -> Dict[str, int]:
+        # Same semantics as counting `re.search(p, text, re.IGNORECASE)` hits per family.
+        matched = set()
+        runs = _RUN_RE.findall(text.lower())
+        first_run = self._first_run
+        for pos, run in enumerate(runs):
+            entries = first_run.get(run)
+            if entries is None:
+                continue
+            for pattern_idx, phrase_runs in entries:
+                if pattern_idx in matched:
+                    continue
+                if len(phrase_runs) == 1 or tuple(runs[pos : pos + len(phrase_runs)]) == phrase_runs:
+                    matched.add(pattern_idx)
+        for pattern_idx, compiled in self._fallback:
+            if compiled.search(text):
+                matched.add(pattern_idx)
+
+        counts = dict.fromkeys(self.families, 0)
+        for pattern_idx in matched:
+            counts[self.families[self._pattern_family[pattern_idx]]] += 1
+        return counts
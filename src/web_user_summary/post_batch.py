@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Union, overload
+
+from .models import RedditPost
+
+
+# Struct-of-arrays container for large post sets. Numeric fields live in typed arrays, and the
+# low-cardinality source / sort_source strings are interned into one table and stored as indexes,
+# so a batch costs a fraction of the equivalent list of RedditPost objects and pickles compactly
+# when chunks are shipped to worker processes. Rows are materialized as RedditPost on demand.
+class PostBatch(Sequence[RedditPost]):
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.selftexts: List[str] = []
+        self.authors: List[str] = []
+        self.permalinks: List[str] = []
+        self.urls: List[str] = []
+        self.created_utc = array("d")
+        self.scores = array("q")
+        self.num_comments = array("q")
+        self.upvote_ratios = array("d")
+        self.source_idx = array("I")
+        self.sort_source_idx = array("I")
+        self.strings: List[str] = []
+        self._string_slot: Dict[str, int] = {}
+
+    @classmethod
+    def from_posts(cls, posts: Iterable[RedditPost]) -> "PostBatch":
+        batch = cls()
+        batch.extend(posts)
+        return batch
+
+    def _intern(self, value: str) -> int:
+        slot = self._string_slot.get(value)
+        if slot is None:
+            slot = len(self.strings)
+            self.strings.append(value)
+            self._string_slot[value] = slot
+        return slot
+
+    def append(self, post: RedditPost) -> None:
+        self.ids.append(post.id)
+        self.titles.append(post.title)
+        self.selftexts.append(post.selftext)
+        self.authors.append(post.author)
+        self.permalinks.append(post.permalink)
+        self.urls.append(post.url)
+        self.created_utc.append(post.created_utc)
+        self.scores.append(post.score)
+        self.num_comments.append(post.num_comments)
+        self.upvote_ratios.append(post.upvote_ratio)
+        self.source_idx.append(self._intern(post.subreddit))
+        self.sort_source_idx.append(self._intern(post.sort_source))
+
+    def extend(self, posts: Iterable[RedditPost]) -> None:
+        for post in posts:
+            self.append(post)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def post(self, i: int) -> RedditPost:
+        return RedditPost(
+            id=self.ids[i],
+            subreddit=self.strings[self.source_idx[i]],
+            title=self.titles[i],
+            selftext=self.selftexts[i],
+            author=self.authors[i],
+            created_utc=self.created_utc[i],
+            score=self.scores[i],
+            num_comments=self.num_comments[i],
+            upvote_ratio=self.upvote_ratios[i],
+            permalink=self.permalinks[i],
+            url=self.urls[i],
+            sort_source=self.strings[self.sort_source_idx[i]],
+        )
+
+    @overload
+    def __getitem__(self, key: int) -> RedditPost: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> "PostBatch": ...
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[RedditPost, "PostBatch"]:
+        if not isinstance(key, slice):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("PostBatch index out of range")
+            return self.post(key)
+        out = PostBatch()
+        for name in (
+            "ids",
+            "titles",
+            "selftexts",
+            "authors",
+            "permalinks",
+            "urls",
+            "created_utc",
+            "scores",
+            "num_comments",
+            "upvote_ratios",
+            "source_idx",
+            "sort_source_idx",
+        ):
+            setattr(out, name, getattr(self, name)[key])
+        # The intern table is shared as-is; slices only hold indexes into it. It is append-only, so
+        # strings interned later by either batch never move an index the other one holds.
+        out.strings = self.strings
+        out._string_slot = self._string_slot
+        return out
+
+    def __iter__(self) -> Iterator[RedditPost]:
+        for i in range(len(self)):
+            yield self.post(i)
+
+    def iter_since(self, cutoff_utc: float) -> Iterator[RedditPost]:
+        # The age filter runs on the timestamp column; only rows that pass are materialized.
+        for i, created in enumerate(self.created_utc):
+            if created >= cutoff_utc:
+                yield self.post(i)
+
+    def source_counts(self) -> Dict[str, int]:
+        counts = [0] * len(self.strings)
+        for slot in self.source_idx:
+            counts[slot] += 1
+        # Interning order is first-appearance order, matching a dict filled while iterating posts.
+        return {self.strings[slot]: n for slot, n in enumerate(counts) if n}
+
+    def iter_dicts(self) -> Iterator[Dict]:
+        # Same rows as RedditPost.to_dict(), built straight from the columns.
+        strings = self.strings
+        for i in range(len(self)):
+            yield {
+                "id": self.ids[i],
+                "subreddit": strings[self.source_idx[i]],
+                "title": self.titles[i],
+                "selftext": self.selftexts[i],
+                "author": self.authors[i],
+                "created_utc": self.created_utc[i],
+                "score": self.scores[i],
+                "num_comments": self.num_comments[i],
+                "upvote_ratio": self.upvote_ratios[i],
+                "permalink": self.permalinks[i],
+                "url": self.urls[i],
+                "sort_source": strings[self.sort_source_idx[i]],
+            }
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+# (requests per second, burst capacity) per API host.
+# HN Algolia allows 10k requests/hour per IP; StackExchange bans IPs above 30 req/s;
+# Reddit allows ~60 (anonymous) to ~100 (OAuth) requests/minute.
+DEFAULT_HOST_RATES: Dict[str, Tuple[float, float]] = {
+    "hn.algolia.com": (2.5, 5.0),
+    "api.stackexchange.com": (5.0, 5.0),
+    "www.reddit.com": (1.0, 2.0),
+    "oauth.reddit.com": (1.5, 3.0),
+}
+DEFAULT_RATE: Tuple[float, float] = (2.0, 4.0)
+QUOTA_LOW_WATERMARK = 50
+MAX_THROTTLE_WAIT_S = 300.0
+
+
+class QuotaExhaustedError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.base_rate = max(0.01, rate)
+        self.rate = self.base_rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.exhausted_reason = ""
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                if self.exhausted_reason:
+                    raise QuotaExhaustedError(self.exhausted_reason)
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait_s = self.blocked_until - now
+                elif self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                else:
+                    wait_s = (1.0 - self.tokens) / self.rate
+            time.sleep(wait_s)
+
+    def defer(self, seconds: float) -> None:
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + max(0.0, seconds))
+            # Resume with an empty bucket so parallel workers do not burst right after a throttle.
+            self.tokens = 0.0
+
+    def set_rate_scale(self, scale: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = self.base_rate * min(1.0, max(0.05, scale))
+
+    def mark_exhausted(self, reason: str) -> None:
+        with self._lock:
+            self.exhausted_reason = reason
+
+
+class HostRateLimiter:
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        self.rates = dict(DEFAULT_HOST_RATES)
+        if rates:
+            self.rates.update(rates)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc or url
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, capacity = self.rates.get(host, DEFAULT_RATE)
+                bucket = TokenBucket(rate, capacity)
+                self._buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url: str) -> None:
+        self.bucket(url).acquire()
+
+    def defer(self, url: str, seconds: float) -> None:
+        bucket = self.bucket(url)
+        if seconds > MAX_THROTTLE_WAIT_S:
+            # Waits this long mean the daily quota is gone; fail fast instead of stalling the run.
+            reason = f"{urlparse(url).netloc} asked to back off for {int(seconds)}s"
+            bucket.mark_exhausted(reason)
+            raise QuotaExhaustedError(reason)
+        bucket.defer(seconds)
+
+    def note_quota(self, url: str, remaining: int) -> None:
+        bucket = self.bucket(url)
+        if remaining <= 0:
+            bucket.mark_exhausted(f"API quota exhausted for {urlparse(url).netloc}")
+        elif remaining < QUOTA_LOW_WATERMARK:
+            bucket.set_rate_scale(remaining / QUOTA_LOW_WATERMARK)
+        else:
+            bucket.set_rate_scale(1.0)
+
+
+def backoff_delay(attempt: int, base_s: float = 1.0, cap_s: float = 30.0) -> float:
+    # Exponential backoff with full jitter.
+    return random.uniform(0.0, min(cap_s, base_s * (2 ** max(0, attempt - 1))))
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    if response.ok:
+        return None
+    raw = (response.headers.get("Retry-After") or "").strip()
+    if raw:
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+        except Exception:
+            pass
+
+    if response.status_code == 400:
+        # StackExchange signals throttling as HTTP 400 with error_name=throttle_violation.
+        try:
+            payload = response.json()
+        except Exception:
+            return None
+        if isinstance(payload, dict) and payload.get("error_name") == "throttle_violation":
+            match = re.search(r"(\d+)\s*seconds", str(payload.get("error_message", "")))
+            return float(match.group(1)) if match else 30.0
+    return None
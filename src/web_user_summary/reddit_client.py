@@ -7,6 +7,7 @@ from typing import Dict, List, Optional
 import requests
 
 from .models import RedditPost
+from .rate_limit import HostRateLimiter, QuotaExhaustedError, backoff_delay, retry_after_seconds
 
 
 class RedditClient:
@@ -17,9 +18,11 @@ class RedditClient:
         max_retries: int = 4,
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
+        rate_limiter: Optional[HostRateLimiter] = None,
     ) -> None:
         self.timeout_s = timeout_s
         self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or HostRateLimiter()
         self.user_agent = user_agent
         self.session = requests.Session()
         self.session.headers.update(
@@ -38,8 +41,10 @@ class RedditClient:
         if not self.use_oauth:
             return
 
+        token_url = "https://www.reddit.com/api/v1/access_token"
+        self.rate_limiter.acquire(token_url)
         response = self.session.post(
-            "https://www.reddit.com/api/v1/access_token",
+            token_url,
             auth=(self.client_id, self.client_secret),
             data={"grant_type": "client_credentials"},
             headers={"User-Agent": self.user_agent},
@@ -76,11 +81,12 @@ class RedditClient:
                     request_url = oauth_url
                     headers["Authorization"] = f"bearer {self.oauth_access_token}"
 
+                self.rate_limiter.acquire(request_url)
                 response = self.session.get(request_url, params=params, headers=headers or None, timeout=self.timeout_s)
 
                 if response.status_code in {429, 500, 502, 503, 504}:
-                    sleep_s = min(12, 2 * attempt)
-                    time.sleep(sleep_s)
+                    throttle_s = retry_after_seconds(response)
+                    self.rate_limiter.defer(request_url, throttle_s if throttle_s is not None else backoff_delay(attempt))
                     continue
 
                 if response.status_code in {401, 403} and using_oauth:
@@ -88,7 +94,7 @@ class RedditClient:
                     self.oauth_access_token = None
                     self.oauth_expires_at = 0.0
                     if attempt < self.max_retries:
-                        time.sleep(1.2 * attempt)
+                        time.sleep(backoff_delay(attempt))
                         continue
 
                 if response.status_code == 403 and not using_oauth:
@@ -99,10 +105,12 @@ class RedditClient:
 
                 response.raise_for_status()
                 return response.json()
+            except QuotaExhaustedError:
+                raise
             except Exception as exc:
                 last_error = exc
                 if attempt < self.max_retries:
-                    time.sleep(1.3 * attempt)
+                    time.sleep(backoff_delay(attempt))
                 else:
                     auth_hint = (
                         " OAuth mode was enabled." if using_oauth else " OAuth mode was not enabled."
@@ -152,7 +160,6 @@ class RedditClient:
             if not after or not children:
                 break
             remaining -= len(children)
-            time.sleep(0.6)
 
         return out
 
@@ -201,6 +208,5 @@ class RedditClient:
             if not after or not children:
                 break
             remaining -= len(children)
-            time.sleep(0.6)
 
         return out
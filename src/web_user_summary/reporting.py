@@ -5,7 +5,9 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Iterable, List
 
+from .artifacts import open_text
 from .models import DemandCandidate, DemandCluster, RedditPost
+from .post_batch import PostBatch
 
 
 def timestamped_output_dir(base_dir: Path) -> Path:
@@ -16,11 +18,33 @@ def timestamped_output_dir(base_dir: Path) -> Path:
 
 
 def write_jsonl(path: Path, rows: Iterable[Dict]) -> None:
-    with path.open("w", encoding="utf-8") as f:
+    # Compressed when the path ends in .gz or .zst.
+    with open_text(path, "w") as f:
         for row in rows:
             f.write(json.dumps(row, ensure_ascii=False) + "\n")
 
 
+class JsonlWriter:
+    # Appends rows one at a time so callers never hold the full serialized list.
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.count = 0
+        self._f = open_text(path, "w")
+
+    def write(self, row: Dict) -> None:
+        self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
 def write_json(path: Path, payload: Dict) -> None:
     path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
 
@@ -44,6 +68,9 @@ def write_markdown_report(path: Path, meta: Dict, clusters: List[DemandCluster],
         lines.append(f"### {idx}. {cluster.summary_demand}")
         lines.append(f"- Cluster ID: `{cluster.cluster_id}`")
         lines.append(f"- Mentions: {cluster.demand_count}")
+        if cluster.first_seen_utc:
+            first_seen = datetime.fromtimestamp(cluster.first_seen_utc, tz=timezone.utc).strftime("%Y-%m-%d")
+            lines.append(f"- Mentions since {first_seen}: {cluster.total_demand_count}")
         lines.append(f"- Avg confidence: {cluster.confidence_avg}")
         lines.append(f"- Avg urgency: {cluster.urgency_avg}")
         lines.append(f"- Sources: {', '.join(cluster.subreddits)}")
@@ -57,6 +84,8 @@ def write_markdown_report(path: Path, meta: Dict, clusters: List[DemandCluster],
 
 
 def serialize_posts(posts: Iterable[RedditPost]) -> List[Dict]:
+    if isinstance(posts, PostBatch):
+        return list(posts.iter_dicts())
     return [p.to_dict() for p in posts]
 
 
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from .demand_extractor import INTENT_MATCHER, POST_MATCHER
+
+# Clear-cut thresholds only; everything in between still goes to the LLM.
+REJECT_BELOW = 0.3
+ACCEPT_AT = 0.8
+ACCEPT_MIN_MENTIONS = 3
+PROMO_REJECT_SHARE = 0.5
+PREFILTER_REASON_PREFIX = "Heuristic pre-filter:"
+
+
+@dataclass
+class PrefilterDecision:
+    cluster_id: str
+    decision: str  # "accept", "reject" or "llm"
+    score: float
+    reasons: List[str] = field(default_factory=list)
+
+    def verdict(self) -> Dict:
+        # Same shape as normalize_result() so it can sit next to LLM verdicts. Only rejections are
+        # settled this way: accepted requirements are published, so they always get the LLM's
+        # normalized wording.
+        return {
+            "cluster_id": self.cluster_id,
+            "accept": False,
+            "normalized_requirement": "",
+            "reason": f"{PREFILTER_REASON_PREFIX} {'; '.join(self.reasons)}",
+            "confidence": round(1.0 - self.score, 2),
+        }
+
+
+def cluster_features(cluster: Dict) -> Dict[str, float]:
+    examples = [e for e in cluster.get("examples", []) or [] if isinstance(e, dict)]
+    summary = str(cluster.get("summary_demand", ""))
+    keywords = " ".join(str(k) for k in cluster.get("keywords", []) or [])
+    texts = [summary] + [f"{e.get('title', '')} {e.get('demand_text', '')}" for e in examples]
+
+    promo = 0
+    for text in texts:
+        hits = POST_MATCHER.hits(text)
+        if hits["self_promo"] or hits["exclude"]:
+            promo += 1
+    intent = INTENT_MATCHER.hits(" ".join(texts + [keywords]))
+    titles = {" ".join(str(e.get("title", "")).lower().split()) for e in examples}
+
+    return {
+        "mentions": float(cluster.get("demand_count", 0) or 0),
+        "confidence_avg": float(cluster.get("confidence_avg", 0.0) or 0.0),
+        "urgency_avg": float(cluster.get("urgency_avg", 0.0) or 0.0),
+        "product_intent": float(intent["product_intent"]),
+        "ask_intent": float(intent["ask_intent"]),
+        "promo_share": promo / len(texts),
+        # Share of distinct example titles beyond the first; 0 for a single example.
+        "diversity": (len(titles) - 1) / (len(examples) - 1) if len(examples) > 1 else 0.0,
+        "sources": float(len(set(cluster.get("subreddits", []) or []))),
+    }
+
+
+def score_features(features: Mapping[str, float]) -> float:
+    score = (
+        0.25 * min(features["mentions"], 5.0) / 5.0
+        + 0.25 * min(features["confidence_avg"], 5.0) / 5.0
+        + 0.05 * min(features["urgency_avg"], 2.0) / 2.0
+        + 0.2 * min(features["product_intent"], 2.0) / 2.0
+        + 0.1 * (1.0 if features["ask_intent"] else 0.0)
+        + 0.1 * features["diversity"]
+        + 0.05 * min(max(features["sources"] - 1.0, 0.0), 1.0)
+    )
+    return max(0.0, score - 0.5 * features["promo_share"])
+
+
+def prefilter_cluster(cluster: Dict) -> PrefilterDecision:
+    cid = str(cluster.get("cluster_id", "")).strip()
+    features = cluster_features(cluster)
+    score = round(score_features(features), 3)
+    if features["promo_share"] >= PROMO_REJECT_SHARE:
+        return PrefilterDecision(cid, "reject", score, ["mostly self-promotion or excluded phrasing"])
+    # Missing intent keywords or a lone mention are not rejects on their own: the keyword lists miss
+    # plainly worded needs, and a single new mention is how every requirement starts. Both still
+    # lower the score.
+    if score < REJECT_BELOW:
+        return PrefilterDecision(cid, "reject", score, [f"low signal score {score:.2f}"])
+    if score >= ACCEPT_AT and features["mentions"] >= ACCEPT_MIN_MENTIONS and not features["promo_share"]:
+        return PrefilterDecision(
+            cid, "accept", score, [f"strong signal score {score:.2f} over {int(features['mentions'])} mentions"]
+        )
+    return PrefilterDecision(cid, "llm", score)
+
+
+def prefilter_clusters(clusters: Sequence[Dict]) -> List[PrefilterDecision]:
+    return [prefilter_cluster(c) for c in clusters]
+
+
+def agreement(decisions: Sequence[PrefilterDecision], past: Mapping[str, bool]) -> Tuple[int, int]:
+    # (matching, compared) over auto-decided clusters that also have an LLM verdict.
+    matching = compared = 0
+    for decision in decisions:
+        if decision.decision == "llm" or decision.cluster_id not in past:
+            continue
+        compared += 1
+        if (decision.decision == "accept") == past[decision.cluster_id]:
+            matching += 1
+    return matching, compared
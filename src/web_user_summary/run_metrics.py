@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_NAME = "run_metrics.json"
+PROFILE_NAME = "profile.pstats"
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    scale = 1.0 if sys.platform == "darwin" else 1024.0
+    return round(usage.ru_maxrss * scale / 2**20, 1)
+
+
+class RunMetrics:
+    # Thread-safe: fetch workers report HTTP counters and per-job timings concurrently.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.http: Dict[str, Dict[str, int]] = {}
+
+    def add_stage(self, name: str, wall_s: float, cpu_s: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            entry["calls"] += 1
+            entry["wall_s"] += wall_s
+            entry["cpu_s"] += cpu_s
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        # CPU is process-wide, so a stage that overlaps worker threads or processes is charged for theirs.
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started, time.process_time() - cpu_started)
+
+    def count_http(self, host: str, field: str, amount: int = 1) -> None:
+        with self._lock:
+            counters = self.http.setdefault(host, {"requests": 0, "bytes": 0, "retries": 0, "errors": 0, "cache_hits": 0})
+            counters[field] = counters.get(field, 0) + amount
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = {
+                name: {"calls": int(v["calls"]), "wall_s": round(v["wall_s"], 4), "cpu_s": round(v["cpu_s"], 4)}
+                for name, v in self.stages.items()
+            }
+            http = {host: dict(counters) for host, counters in self.http.items()}
+        return {
+            "wall_s": round(time.perf_counter() - self._started, 4),
+            "cpu_s": round(time.process_time() - self._cpu_started, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_children_mb": peak_rss_mb(children=True),
+            "stages": stages,
+            "http": http,
+        }
+
+    def write(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
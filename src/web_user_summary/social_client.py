@@ -3,17 +3,63 @@ from __future__ import annotations
 import html
 import re
 import time
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
 
 import requests
 
+from .http_cache import CacheEntry, ResponseCache
 from .models import RedditPost
+from .rate_limit import HostRateLimiter, QuotaExhaustedError, backoff_delay, retry_after_seconds
+from .run_metrics import RunMetrics
+
+HN_SEARCH_URL = "https://hn.algolia.com/api/v1/search_by_date"
+SE_SEARCH_URL = "https://api.stackexchange.com/2.3/search/advanced"
+# Story IDs per engagement refresh request.
+HN_REFRESH_BATCH = 100
+# Sites on their own domains; the rest live under stackexchange.com.
+SE_SITE_DOMAINS = {
+    "stackoverflow": "stackoverflow.com",
+    "superuser": "superuser.com",
+    "serverfault": "serverfault.com",
+    "askubuntu": "askubuntu.com",
+    "stackapps": "stackapps.com",
+}
+
+
+def stackexchange_question_url(site: str, question_id: str) -> str:
+    # The API also accepts full domains (e.g. "mathoverflow.net") as the site parameter.
+    domain = SE_SITE_DOMAINS.get(site) or (site if "." in site else f"{site}.stackexchange.com")
+    return f"https://{domain}/questions/{question_id}"
+
+
+@dataclass
+class SearchPage:
+    posts: List[RedditPost]
+    raw_count: int
+    has_more: bool
+    page_count: Optional[int] = None
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
 
 
 class SocialClient:
-    def __init__(self, user_agent: str, timeout_s: int = 20, max_retries: int = 4) -> None:
+    def __init__(
+        self,
+        user_agent: str,
+        timeout_s: int = 20,
+        max_retries: int = 4,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[RunMetrics] = None,
+    ) -> None:
         self.timeout_s = timeout_s
+        self.metrics = metrics
         self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.cache = cache
         self.session = requests.Session()
         self.session.headers.update(
             {
@@ -22,86 +68,223 @@ class SocialClient:
             }
         )
 
+    def _count(self, url: str, field: str, amount: int = 1) -> None:
+        if self.metrics is not None:
+            self.metrics.count_http(urlparse(url).netloc, field, amount)
+
     def _request_json(self, url: str, params: Optional[Dict] = None) -> Dict:
+        cache_key = ""
+        cached: Optional[CacheEntry] = None
+        if self.cache is not None:
+            cache_key = self.cache.key(url, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None and cached.is_fresh(self.cache.ttl_s):
+                self.cache.record("hits")
+                self._count(url, "cache_hits")
+                return cached.payload
+
         last_error: Optional[Exception] = None
         for attempt in range(1, self.max_retries + 1):
             try:
-                response = self.session.get(url, params=params, timeout=self.timeout_s)
-                if response.status_code in {429, 500, 502, 503, 504}:
-                    time.sleep(min(10, 1.5 * attempt))
+                self.rate_limiter.acquire(url)
+                headers = cached.revalidation_headers() if cached is not None else None
+                response = self.session.get(url, params=params, headers=headers or None, timeout=self.timeout_s)
+                self._count(url, "requests")
+                self._count(url, "bytes", len(response.content))
+                if response.status_code == 304 and cached is not None and self.cache is not None:
+                    self.cache.record("revalidated")
+                    self.cache.touch(cache_key, cached)
+                    return cached.payload
+                throttle_s = retry_after_seconds(response)
+                if response.status_code in RETRYABLE_STATUS or throttle_s is not None:
+                    self.rate_limiter.defer(url, throttle_s if throttle_s is not None else backoff_delay(attempt))
+                    if attempt < self.max_retries:
+                        self._count(url, "retries")
                     continue
                 response.raise_for_status()
-                return response.json()
+                payload = response.json()
+                self._observe_quota(url, payload)
+                if self.cache is not None:
+                    self.cache.record("misses")
+                    self.cache.put(
+                        cache_key,
+                        url,
+                        payload,
+                        etag=response.headers.get("ETag", ""),
+                        last_modified=response.headers.get("Last-Modified", ""),
+                    )
+                return payload
+            except QuotaExhaustedError:
+                raise
             except Exception as exc:
                 last_error = exc
+                self._count(url, "errors")
                 if attempt < self.max_retries:
-                    time.sleep(1.3 * attempt)
+                    self._count(url, "retries")
+                    time.sleep(backoff_delay(attempt))
                 else:
                     raise RuntimeError(f"Social request failed after retries: {url}") from last_error
         raise RuntimeError(f"Unexpected request failure: {url}")
 
+    def _observe_quota(self, url: str, payload: Dict) -> None:
+        # StackExchange asks clients to pause for `backoff` seconds and reports the daily quota left.
+        if not isinstance(payload, dict):
+            return
+        backoff = payload.get("backoff")
+        if backoff:
+            self.rate_limiter.defer(url, float(backoff))
+        quota_remaining = payload.get("quota_remaining")
+        if quota_remaining is not None:
+            self.rate_limiter.note_quota(url, int(quota_remaining))
+
     @staticmethod
     def _strip_html(raw: str) -> str:
         text = re.sub(r"<[^>]+>", " ", raw or "")
         text = html.unescape(text)
         return re.sub(r"\s+", " ", text).strip()
 
-    def fetch_hn_search(self, query: str, limit: int = 60) -> List[RedditPost]:
+    def fetch_hn_page(
+        self,
+        query: str,
+        page: int,
+        hits_per_page: int,
+        created_since_utc: Optional[int] = None,
+    ) -> SearchPage:
+        params: Dict = {
+            "query": query,
+            "tags": "story",
+            "hitsPerPage": hits_per_page,
+            "page": page,
+        }
+        if created_since_utc is not None:
+            params["numericFilters"] = f"created_at_i>={int(created_since_utc)}"
+        payload = self._request_json(HN_SEARCH_URL, params=params)
+        hits = payload.get("hits", [])
+        out: List[RedditPost] = []
+        for item in hits:
+            post_id = str(item.get("objectID", "")).strip()
+            title = str(item.get("title") or item.get("story_title") or "").strip()
+            if not post_id or not title:
+                continue
+            created_utc = float(item.get("created_at_i") or 0)
+            points = int(item.get("points") or 0)
+            num_comments = int(item.get("num_comments") or 0)
+            permalink = f"https://news.ycombinator.com/item?id={post_id}"
+            url = str(item.get("url") or permalink)
+            body = str(item.get("story_text") or item.get("comment_text") or "").strip()
+
+            out.append(
+                RedditPost(
+                    id=post_id,
+                    subreddit="hackernews",
+                    title=title,
+                    selftext=body,
+                    author=str(item.get("author") or ""),
+                    created_utc=created_utc,
+                    score=points,
+                    num_comments=num_comments,
+                    upvote_ratio=0.0,
+                    permalink=permalink,
+                    url=url,
+                    sort_source=f"hn:{query}",
+                )
+            )
+
+        page_count = int(payload.get("nbPages") or 0)
+        has_more = len(hits) >= hits_per_page and page + 1 < page_count
+        return SearchPage(posts=out, raw_count=len(hits), has_more=has_more, page_count=page_count)
+
+    def fetch_hn_engagement(self, story_ids: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+        # Story ID -> (points, num_comments). Algolia ANDs comma-separated tags and ORs a parenthesised
+        # group, so one request covers a whole batch of known stories.
+        if not story_ids:
+            return {}
+        params: Dict = {
+            "tags": "story,(" + ",".join(f"story_{story_id}" for story_id in story_ids) + ")",
+            "hitsPerPage": len(story_ids),
+        }
+        payload = self._request_json(HN_SEARCH_URL, params=params)
+        out: Dict[str, Tuple[int, int]] = {}
+        for item in payload.get("hits", []):
+            post_id = str(item.get("objectID", "")).strip()
+            if post_id:
+                out[post_id] = (int(item.get("points") or 0), int(item.get("num_comments") or 0))
+        return out
+
+    def fetch_stackexchange_page(
+        self,
+        query: str,
+        site: str,
+        page: int,
+        page_size: int,
+        from_date_utc: Optional[int] = None,
+    ) -> SearchPage:
+        params: Dict = {
+            "order": "desc",
+            "sort": "creation",
+            "site": site,
+            "q": query,
+            "pagesize": page_size,
+            "page": page,
+            "filter": "withbody",
+        }
+        if from_date_utc is not None:
+            params["fromdate"] = int(from_date_utc)
+
+        payload = self._request_json(SE_SEARCH_URL, params=params)
+        items = payload.get("items", [])
+        out: List[RedditPost] = []
+        for item in items:
+            question_id = str(item.get("question_id", "")).strip()
+            title = str(item.get("title") or "").strip()
+            if not question_id or not title:
+                continue
+
+            body = self._strip_html(str(item.get("body") or ""))
+            created_utc = float(item.get("creation_date") or 0)
+            permalink = str(item.get("link") or "")
+            if not permalink:
+                permalink = stackexchange_question_url(site, question_id)
+            score = int(item.get("score") or 0)
+            answers = int(item.get("answer_count") or 0)
+
+            out.append(
+                RedditPost(
+                    id=question_id,
+                    subreddit=f"stackexchange:{site}",
+                    title=title,
+                    selftext=body,
+                    author=str(item.get("owner", {}).get("display_name") or ""),
+                    created_utc=created_utc,
+                    score=score,
+                    num_comments=answers,
+                    upvote_ratio=0.0,
+                    permalink=permalink,
+                    url=permalink,
+                    sort_source=f"se:{site}:{query}",
+                )
+            )
+
+        has_more = bool(items) and bool(payload.get("has_more"))
+        return SearchPage(posts=out, raw_count=len(items), has_more=has_more)
+
+    def fetch_hn_search(self, query: str, limit: int = 60, created_since_utc: Optional[int] = None) -> List[RedditPost]:
         out: List[RedditPost] = []
         page = 0
         remaining = max(1, limit)
+        page_size = min(100, remaining)
 
         while remaining > 0:
-            page_limit = min(100, remaining)
-            payload = self._request_json(
-                "https://hn.algolia.com/api/v1/search_by_date",
-                params={
-                    "query": query,
-                    "tags": "story",
-                    "hitsPerPage": page_limit,
-                    "page": page,
-                },
+            result = self.fetch_hn_page(
+                query, page=page, hits_per_page=page_size, created_since_utc=created_since_utc
             )
-            hits = payload.get("hits", [])
-            if not hits:
+            out.extend(result.posts)
+            remaining -= result.raw_count
+            if not result.has_more:
                 break
-
-            for item in hits:
-                post_id = str(item.get("objectID", "")).strip()
-                title = str(item.get("title") or item.get("story_title") or "").strip()
-                if not post_id or not title:
-                    continue
-                created_utc = float(item.get("created_at_i") or 0)
-                points = int(item.get("points") or 0)
-                num_comments = int(item.get("num_comments") or 0)
-                permalink = f"https://news.ycombinator.com/item?id={post_id}"
-                url = str(item.get("url") or permalink)
-                body = str(item.get("story_text") or item.get("comment_text") or "").strip()
-
-                out.append(
-                    RedditPost(
-                        id=post_id,
-                        subreddit="hackernews",
-                        title=title,
-                        selftext=body,
-                        author=str(item.get("author") or ""),
-                        created_utc=created_utc,
-                        score=points,
-                        num_comments=num_comments,
-                        upvote_ratio=0.0,
-                        permalink=permalink,
-                        url=url,
-                        sort_source=f"hn:{query}",
-                    )
-                )
-
             page += 1
-            remaining -= len(hits)
-            if len(hits) < page_limit:
-                break
-            time.sleep(0.3)
 
-        return out
+        return out[: max(1, limit)]
 
     def fetch_stackexchange_search(
         self,
@@ -113,61 +296,16 @@ class SocialClient:
         out: List[RedditPost] = []
         page = 1
         remaining = max(1, limit)
+        page_size = min(100, remaining)
 
         while remaining > 0:
-            page_limit = min(100, remaining)
-            params: Dict = {
-                "order": "desc",
-                "sort": "creation",
-                "site": site,
-                "q": query,
-                "pagesize": page_limit,
-                "page": page,
-                "filter": "withbody",
-            }
-            if from_date_utc is not None:
-                params["fromdate"] = int(from_date_utc)
-
-            payload = self._request_json("https://api.stackexchange.com/2.3/search/advanced", params=params)
-            items = payload.get("items", [])
-            if not items:
-                break
-
-            for item in items:
-                question_id = str(item.get("question_id", "")).strip()
-                title = str(item.get("title") or "").strip()
-                if not question_id or not title:
-                    continue
-
-                body = self._strip_html(str(item.get("body") or ""))
-                created_utc = float(item.get("creation_date") or 0)
-                permalink = str(item.get("link") or "")
-                if not permalink:
-                    permalink = f"https://stackoverflow.com/questions/{question_id}"
-                score = int(item.get("score") or 0)
-                answers = int(item.get("answer_count") or 0)
-
-                out.append(
-                    RedditPost(
-                        id=question_id,
-                        subreddit=f"stackexchange:{site}",
-                        title=title,
-                        selftext=body,
-                        author=str(item.get("owner", {}).get("display_name") or ""),
-                        created_utc=created_utc,
-                        score=score,
-                        num_comments=answers,
-                        upvote_ratio=0.0,
-                        permalink=permalink,
-                        url=permalink,
-                        sort_source=f"se:{site}:{query}",
-                    )
-                )
-
-            remaining -= len(items)
-            if not payload.get("has_more"):
+            result = self.fetch_stackexchange_page(
+                query, site=site, page=page, page_size=page_size, from_date_utc=from_date_utc
+            )
+            out.extend(result.posts)
+            remaining -= result.raw_count
+            if not result.has_more:
                 break
             page += 1
-            time.sleep(0.35)
 
-        return out
+        return out[: max(1, limit)]
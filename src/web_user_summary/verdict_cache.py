@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Sequence, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verdicts_created_at ON verdicts (created_at);
+"""
+
+DEFAULT_MAX_AGE_S = 30 * 86400
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def verdict_key(provider: str, model: str, system_prompt: str, item: Dict) -> str:
+    # Keyed on the requirement itself, not the whole item: mention counts, examples and cluster ids
+    # shift from run to run while the demand being judged stays the same. A prompt or model change
+    # still yields a new key.
+    text = " ".join(_WORD_RE.findall(str(item.get("summary_demand", "")).lower()))
+    blob = json.dumps([provider, model, system_prompt, text], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    def __init__(self, path: Path, max_age_s: float = DEFAULT_MAX_AGE_S) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_age_s = max_age_s
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(SCHEMA)
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def evict_expired(self) -> int:
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM verdicts WHERE created_at < ?", (time.time() - self.max_age_s,))
+        self.stats["evicted"] += cursor.rowcount
+        return cursor.rowcount
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        keys = list(keys)
+        out = self.peek_many(keys)
+        self.stats["hits"] += len(out)
+        self.stats["misses"] += len(keys) - len(out)
+        return out
+
+    def peek_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        # Lookup without touching the hit-rate stats.
+        keys = list(keys)
+        cutoff = time.time() - self.max_age_s
+        out: Dict[str, Dict] = {}
+        # Stay under SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = self.conn.execute(
+                f"SELECT key, verdict FROM verdicts WHERE key IN ({placeholders}) AND created_at >= ?",
+                [*chunk, cutoff],
+            ).fetchall()
+            out.update({r[0]: json.loads(r[1]) for r in rows})
+        return out
+
+    def put_many(self, provider: str, model: str, verdicts: Sequence[Tuple[str, Dict]]) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO verdicts (key, provider, model, verdict, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, provider, model, json.dumps(v, ensure_ascii=False), now) for key, v in verdicts],
+            )
+        self.stats["stored"] += len(verdicts)
+
+    def summary(self) -> str:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = 100.0 * self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"LLM verdict cache: {self.stats['hits']}/{lookups} hits ({rate:.0f}%), "
+            f"{self.stats['stored']} new verdicts stored, {self.stats['evicted']} expired entries evicted"
+        )
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import math
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from benchmarks.bench_bulk_posting import StubIdeasServer, run_poster, write_accepted
+
+IDEAS = 7
+BULK_SIZE = 3
+
+
+@pytest.fixture
+def run_dir(tmp_path: Path) -> Path:
+    write_accepted(tmp_path, IDEAS)
+    return tmp_path
+
+
+@contextmanager
+def serving(server: StubIdeasServer) -> Iterator[StubIdeasServer]:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_bulk_sends_one_request_per_batch(run_dir: Path) -> None:
+    with serving(StubIdeasServer(0.0, 0.0, bulk=True)) as server:
+        result = run_poster(server, run_dir, ["--bulk-size", str(BULK_SIZE), "--workers", "4"])
+
+    assert result["requests"] == math.ceil(IDEAS / BULK_SIZE)
+    assert result["posted"] == IDEAS
+    # Batches go out one after another so the site checks each against everything posted before it.
+    assert result["max_in_flight"] == 1
+
+
+@pytest.mark.parametrize("missing_status", [404, 405])
+def test_missing_bulk_endpoint_falls_back_to_single_posts(run_dir: Path, missing_status: int) -> None:
+    with serving(StubIdeasServer(0.0, 0.0, bulk=False, missing_status=missing_status)) as server:
+        result = run_poster(server, run_dir, ["--bulk-size", str(BULK_SIZE), "--workers", "4"])
+
+    # One probe of the bulk endpoint, then every idea on its own.
+    assert result["requests"] == 1 + IDEAS
+    assert result["posted"] == IDEAS